@@ -0,0 +1,199 @@
+import numpy as np
+import pandas as pd
+
+# --- CONFIGURACIÓN DE LA ANALÍTICA ---
+
+# Columna de referencia para los rendimientos reales
+COLUMNA_INFLACION = 'Inflación'
+
+# Prefijo de las columnas de dólar en la serie consolidada
+PREFIJO_DOLAR = 'Dólar'
+
+# Estimación de TNA: ventana y límites (evita proyecciones irreales si el fondo
+# tuvo una semana muy buena o muy mala)
+DIAS_TNA = 30
+TNA_MINIMA = 20.0
+TNA_MAXIMA = 60.0
+TNA_POR_DEFECTO = 35.0
+
+# Tabla de estadísticas por fondo: ventanas de TNA y de volatilidad (días)
+VENTANAS_TNA = (7, 30, 90)
+DIAS_VOLATILIDAD = 90
+
+
+# FUNCIONES PURAS (pandas / NumPy, sin Streamlit):
+# las usa el dashboard y se pueden correr igual en benchmarks o procesos batch.
+
+
+def columnas_fci(df) -> list:
+    """Columnas de billeteras/FCI: todo lo que no es Inflación ni Dólar"""
+    return [c for c in df.columns if c != COLUMNA_INFLACION and not c.startswith(PREFIJO_DOLAR)]
+
+
+# ==================== CONSOLIDACIÓN ====================
+
+def consolidar_series(df_largo, billeteras_conocidas, normalizar_billeteras=False):
+    """
+    Pasa la serie larga (una fila por fecha y serie) a una columna por activo.
+
+    Args:
+        df_largo (pd.DataFrame): Columnas ['fecha', 'serie', 'valor'].
+        billeteras_conocidas (list): Series que se tratan como billeteras.
+        normalizar_billeteras (bool): Re-basa las billeteras a 100 en el primer día
+            (para la TNA acumulada, cuyo nivel absoluto depende de dónde arranca el historial).
+
+    Returns:
+        pd.DataFrame: Índice fecha; columnas billeteras, tipos de dólar e Inflación
+        (en ese orden), sin los primeros días en los que alguna serie no arrancó.
+    """
+    df_cons = df_largo.pivot(index='fecha', columns='serie', values='valor')
+    # Columnas como strings comunes (se agregan columnas nuevas más adelante)
+    df_cons.columns = df_cons.columns.astype(str)
+    df_cons.columns.name = None
+
+    billeteras = sorted(c for c in df_cons.columns if c in billeteras_conocidas)
+    dolares = sorted(c for c in df_cons.columns if c.startswith(f'{PREFIJO_DOLAR} '))
+    columnas = billeteras + dolares + ([COLUMNA_INFLACION] if COLUMNA_INFLACION in df_cons.columns else [])
+
+    df_cons = df_cons[columnas].dropna()
+
+    if normalizar_billeteras and billeteras and not df_cons.empty:
+        df_cons[billeteras] = normalizar_base_100(df_cons[billeteras])
+
+    return df_cons
+
+
+# ==================== NORMALIZACIÓN Y RENDIMIENTOS ====================
+
+def filtrar_ventana(df, dias):
+    """Últimos `dias` días contados desde la última fecha del índice"""
+    if df.empty:
+        return df
+    return df[df.index >= df.index.max() - pd.Timedelta(days=dias)]
+
+
+def normalizar_base_100(df):
+    """Todas las columnas arrancan en 100 en la primera fila"""
+    if df.empty:
+        return df
+    return df / df.iloc[0] * 100
+
+
+def rendimientos_periodo(df_norm):
+    """
+    Returns:
+        pd.Series: Variación % de cada columna entre la primera y la última fila
+        (df_norm ya en base 100).
+    """
+    return df_norm.iloc[-1] - 100
+
+
+def mejor_fondo(rendimientos, fondos) -> tuple:
+    """
+    Fondo con mayor rendimiento del periodo.
+
+    Args:
+        rendimientos (pd.Series): Salida de rendimientos_periodo.
+        fondos (list): Candidatos (ver columnas_fci: sin Dólar ni Inflación).
+
+    Returns:
+        tuple: (nombre, rendimiento %)
+    """
+    rend_fci = rendimientos[fondos]
+    nombre = rend_fci.idxmax()
+    return nombre, rend_fci[nombre]
+
+
+def rendimiento_real(df_norm, columna_inflacion=COLUMNA_INFLACION):
+    """
+    Ganancia/pérdida de cada instrumento por encima de la inflación (puntos de base 100).
+
+    Positivo: se ganó poder de compra. Negativo: se perdió.
+
+    Returns:
+        pd.DataFrame: Mismas columnas que df_norm, sin la de inflación.
+    """
+    return df_norm.drop(columns=[columna_inflacion]).sub(df_norm[columna_inflacion], axis=0)
+
+
+# ==================== ESTIMACIÓN DE TASAS ====================
+
+def estimar_tna(df, columnas=None, dias=DIAS_TNA, minima=TNA_MINIMA, maxima=TNA_MAXIMA, por_defecto=TNA_POR_DEFECTO):
+    """
+    TNA reciente de cada fondo a partir de su crecimiento en los últimos `dias` días.
+
+    Rendimiento diario geométrico: (ValorFinal / ValorInicial) ^ (1 / cantidad_datos) - 1,
+    anualizado * 365. Todas las columnas se calculan a la vez.
+
+    Args:
+        df (pd.DataFrame): Serie consolidada (índice fecha).
+        columnas (list): Columnas a estimar (por defecto, las de FCI).
+        dias (int): Ventana hacia atrás desde la última fecha.
+        minima, maxima (float): Límites de la TNA estimada.
+        por_defecto (float): Valor si la columna no tiene al menos dos datos.
+
+    Returns:
+        pd.Series: TNA % anual por columna.
+    """
+    columnas = columnas_fci(df) if columnas is None else list(columnas)
+    ventana = filtrar_ventana(df[columnas], dias)
+    if ventana.empty:
+        return pd.Series(por_defecto, index=columnas, dtype='float64')
+
+    cantidad = ventana.count()
+    primero = ventana.bfill().iloc[0]
+    ultimo = ventana.ffill().iloc[-1]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rendimiento_diario = (ultimo / primero) ** (1 / cantidad) - 1
+    tna = (rendimiento_diario * 365 * 100).where(cantidad > 1, por_defecto)
+
+    # NaN (ej: base negativa) vuelve al valor por defecto; ±inf queda en los límites
+    return tna.fillna(por_defecto).clip(minima, maxima).astype('float64')
+
+
+def estadisticas_fondos(df, columnas=None, ventanas=VENTANAS_TNA, dias_volatilidad=DIAS_VOLATILIDAD):
+    """
+    Tabla de estadísticas por fondo a partir de la serie de VCP (una fila por fondo).
+
+    Es el mismo cálculo que la vista 'estadisticas_fondos' que refresca el ETL:
+    el dashboard lo usa solo si la vista todavía no existe.
+
+    Args:
+        df (pd.DataFrame): Serie consolidada de VCP (índice fecha).
+        columnas (list): Fondos a incluir (por defecto, las columnas de FCI).
+        ventanas (tuple): Días de cada TNA (ver estimar_tna).
+        dias_volatilidad (int): Ventana de la volatilidad.
+
+    Returns:
+        pd.DataFrame: Índice fondo; columnas 'tna_7d', 'tna_30d', 'tna_90d' (TNA % sin
+        límites, NaN sin datos suficientes), 'volatilidad' (% anualizada de los
+        rendimientos diarios) y 'ultimo_vcp'.
+    """
+    columnas = columnas_fci(df) if columnas is None else list(columnas)
+    tabla = pd.DataFrame(index=pd.Index(columnas, name='fondo'))
+
+    for dias in ventanas:
+        tabla[f'tna_{dias}d'] = estimar_tna(df, columnas, dias, minima=-np.inf, maxima=np.inf, por_defecto=np.nan)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_rendimientos = np.log(filtrar_ventana(df[columnas], dias_volatilidad)).diff()
+    tabla['volatilidad'] = log_rendimientos.std() * np.sqrt(365) * 100
+    tabla['ultimo_vcp'] = df[columnas].ffill().iloc[-1] if not df.empty else np.nan
+    return tabla.astype('float64')
+
+
+def tna_para_proyeccion(estadisticas, fondos, dias=DIAS_TNA, minima=TNA_MINIMA, maxima=TNA_MAXIMA, por_defecto=TNA_POR_DEFECTO):
+    """
+    TNA que usan las pestañas de proyección, leída de la tabla de estadísticas.
+
+    Args:
+        estadisticas (pd.DataFrame): Ver estadisticas_fondos.
+        fondos (list): Fondos pedidos (los que falten en la tabla toman el valor por defecto).
+        dias (int): Ventana de la TNA (una de VENTANAS_TNA).
+
+    Returns:
+        pd.Series: TNA % anual por fondo, limitada entre `minima` y `maxima`.
+    """
+    tna = estadisticas[f'tna_{dias}d'].reindex(list(fondos))
+    return tna.fillna(por_defecto).clip(minima, maxima).astype('float64')
@@ -0,0 +1,278 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from contextlib import contextmanager
+import pandas as pd
+import threading
+import tempfile
+import hashlib
+import time
+import os
+import re
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin lock entre procesos (cada réplica carga por su cuenta)
+    fcntl = None
+
+# --- CONFIGURACIÓN DE LA CARGA COMPARTIDA ---
+
+# Claves (métrica, ventana) que se mantienen en memoria
+MAX_ENTRADAS = 16
+
+# Recargas en segundo plano que pueden correr al mismo tiempo
+HILOS_RECARGA = 2
+
+# Dónde se comparten los datos entre procesos:
+#   - "memoria": nada compartido, cada proceso consulta la base
+#   - "parquet": archivos en disco que leen todas las réplicas del mismo host
+BACKEND_CACHE = os.getenv("DASHBOARD_CACHE", "memoria")
+
+# Carpeta de los archivos Parquet (tiene que ser la misma para todas las réplicas)
+DIRECTORIO_CACHE = os.getenv("DASHBOARD_CACHE_DIR", os.path.join(tempfile.gettempdir(), "monitor_financiero_cache"))
+
+# Versiones por clave que quedan en disco (la última escrita y la anterior): dos réplicas
+# pueden estar un momento en versiones distintas sin borrarse los archivos entre sí
+VERSIONES_POR_CLAVE = 2
+
+
+# ==================== BACKENDS ====================
+
+class BackendMemoria:
+    """Sin almacenamiento compartido: solo queda el cache en memoria del proceso"""
+
+    def leer(self, clave, version):
+        return None
+
+    def guardar(self, clave, version, df):
+        pass
+
+    @contextmanager
+    def bloqueo(self, clave):
+        yield
+
+
+class BackendParquet:
+    """
+    Un archivo Parquet por clave y versión, compartido por todos los procesos del host.
+
+    Un lock de archivo por clave hace que una sola réplica consulte la base: las
+    demás esperan y leen el archivo que dejó. Al guardar una versión se conservan
+    las VERSIONES_POR_CLAVE escritas más recientemente y se borran las demás.
+    """
+
+    def __init__(self, directorio=DIRECTORIO_CACHE):
+        self.directorio = directorio
+        os.makedirs(directorio, exist_ok=True)
+
+    def _prefijo(self, clave):
+        return hashlib.sha1(repr(clave).encode("utf-8")).hexdigest()[:16]
+
+    def _ruta(self, clave, version):
+        version_segura = re.sub(r"[^\w.-]", "_", str(version))
+        return os.path.join(self.directorio, f"{self._prefijo(clave)}-{version_segura}.parquet")
+
+    def leer(self, clave, version):
+        """
+        Returns:
+            pd.DataFrame: Datos guardados para esa clave y versión, o None si no hay
+        """
+        try:
+            return pd.read_parquet(self._ruta(clave, version))
+        except (OSError, ValueError):
+            return None
+
+    def guardar(self, clave, version, df):
+        ruta = self._ruta(clave, version)
+        try:
+            # Escritura atómica: ningún proceso lee un archivo a medio escribir
+            temporal = f"{ruta}.{os.getpid()}.tmp"
+            df.to_parquet(temporal)
+            os.replace(temporal, ruta)
+
+            self._borrar_versiones_viejas(clave, ruta)
+        except (OSError, ValueError):
+            # Sin disco compartido el dashboard sigue funcionando con el cache en memoria
+            pass
+
+    def _borrar_versiones_viejas(self, clave, ruta):
+        """Deja la versión recién escrita y las más recientes de la clave (por fecha de escritura)"""
+        prefijo = f"{self._prefijo(clave)}-"
+        otras = []
+        for nombre in os.listdir(self.directorio):
+            otra = os.path.join(self.directorio, nombre)
+            if nombre.startswith(prefijo) and nombre.endswith(".parquet") and otra != ruta:
+                try:
+                    otras.append((os.path.getmtime(otra), otra))
+                except OSError:
+                    pass  # Otra réplica la borró mientras tanto
+        for _, vieja in sorted(otras, reverse=True)[VERSIONES_POR_CLAVE - 1:]:
+            try:
+                os.remove(vieja)
+            except OSError:
+                pass
+
+    @contextmanager
+    def bloqueo(self, clave):
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directorio, f"{self._prefijo(clave)}.lock"), "w") as archivo:
+            fcntl.flock(archivo, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(archivo, fcntl.LOCK_UN)
+
+
+BACKENDS = {
+    "memoria": BackendMemoria,
+    "parquet": BackendParquet,
+}
+
+
+def crear_backend(nombre=BACKEND_CACHE):
+    if nombre not in BACKENDS:
+        raise ValueError(f"Backend de cache desconocido: '{nombre}' (opciones: {', '.join(BACKENDS)})")
+    return BACKENDS[nombre]()
+
+
+# ==================== CACHE COMPARTIDO ====================
+
+class CargaCompartida:
+    """
+    Cache de datos compartido por todas las sesiones del dashboard.
+
+    - Single-flight: por cada clave hay como mucho una carga en curso; las
+      sesiones que llegan mientras tanto esperan esa misma carga.
+    - Stale-while-revalidate: cuando cambia la versión de los datos, la primera
+      sesión lanza la recarga en segundo plano y todas siguen recibiendo el
+      resultado anterior hasta que el nuevo está completo.
+
+    El resultado nuevo se publica de una sola vez (reemplazo de referencia bajo
+    lock): ninguna sesión ve un estado a medio cargar.
+
+    Con un backend compartido (ver BACKENDS) la carga primero busca la misma
+    versión en el backend: entre N réplicas solo una consulta la base.
+    """
+
+    def __init__(self, max_entradas=MAX_ENTRADAS, hilos=HILOS_RECARGA, backend=None):
+        self.max_entradas = max_entradas
+        self.backend = backend or crear_backend()
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()
+        self._executor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="recarga_dashboard")
+
+    def _cargar_con_backend(self, clave, version, cargar):
+        valor = self.backend.leer(clave, version)
+        if valor is not None:
+            return valor
+        with self.backend.bloqueo(clave):
+            # Otra réplica pudo terminar la misma carga mientras esperábamos el lock
+            valor = self.backend.leer(clave, version)
+            if valor is None:
+                valor = cargar()
+                self.backend.guardar(clave, version, valor)
+        return valor
+
+    def _recargar(self, clave, version, cargar):
+        """Corre en el pool: calcula el valor nuevo y lo publica si salió bien"""
+        try:
+            valor = self._cargar_con_backend(clave, version, cargar)
+        except Exception:
+            # Se conserva el valor anterior; la próxima consulta vuelve a intentar
+            with self._lock:
+                if clave in self._entradas:
+                    self._entradas[clave]["futuro"] = None
+            raise
+
+        with self._lock:
+            if clave in self._entradas:
+                self._entradas[clave].update(valor=valor, version=version, futuro=None)
+        return valor
+
+    def obtener(self, clave, version, cargar):
+        """
+        Devuelve el valor de `clave` para la versión pedida (o el anterior mientras se recarga).
+
+        Args:
+            clave (hashable): Identifica el resultado (ej: (métrica, días)).
+            version (str): Versión de los datos; si cambia, el valor se recarga.
+            cargar (callable): Función sin argumentos que calcula el valor.
+
+        Returns:
+            El valor cacheado. Solo la primera carga de una clave hace esperar.
+        """
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                entrada = {"valor": None, "version": None, "futuro": None}
+                self._entradas[clave] = entrada
+                while len(self._entradas) > self.max_entradas:
+                    self._entradas.popitem(last=False)
+            self._entradas.move_to_end(clave)
+
+            if entrada["valor"] is not None and entrada["version"] == version:
+                return entrada["valor"]
+
+            if entrada["futuro"] is None:
+                entrada["futuro"] = self._executor.submit(self._recargar, clave, version, cargar)
+
+            valor, futuro = entrada["valor"], entrada["futuro"]
+
+        # Hay un valor anterior: se sirve mientras la recarga sigue en segundo plano
+        if valor is not None:
+            return valor
+        # Primera carga de la clave: todas las sesiones esperan el mismo resultado
+        return futuro.result()
+
+
+# ==================== PRECALENTAMIENTO ====================
+
+class Precalentamiento:
+    """
+    Corre pasos de arranque (conexión, cargas más pedidas) en un hilo aparte.
+
+    El estado se puede consultar en cualquier momento (ver `resumen`): las
+    sesiones no esperan al precalentamiento, pero si piden una clave que se
+    está cargando se suman a esa misma carga (single-flight).
+    """
+
+    def __init__(self, pasos):
+        """
+        Args:
+            pasos (list): Tuplas (nombre, función sin argumentos), en orden de ejecución.
+        """
+        self.pasos = list(pasos)
+        self.resultados = {}
+        self.segundos = None
+        self.listo = threading.Event()
+        self._hilo = threading.Thread(target=self._correr, name="precalentamiento_dashboard", daemon=True)
+
+    def iniciar(self):
+        self._hilo.start()
+        return self
+
+    def _correr(self):
+        inicio = time.perf_counter()
+        for nombre, funcion in self.pasos:
+            inicio_paso = time.perf_counter()
+            try:
+                funcion()
+                self.resultados[nombre] = {"estado": "ok", "segundos": time.perf_counter() - inicio_paso, "error": None}
+            except Exception as e:
+                self.resultados[nombre] = {"estado": "error", "segundos": time.perf_counter() - inicio_paso, "error": str(e)}
+        self.segundos = time.perf_counter() - inicio
+        self.listo.set()
+
+    def resumen(self) -> dict:
+        """
+        Returns:
+            dict: {'listo': bool, 'segundos': float, 'pasos': {nombre: resultado}, 'errores': [nombres]}
+        """
+        pasos = dict(self.resultados)
+        return {
+            "listo": self.listo.is_set(),
+            "segundos": self.segundos,
+            "pasos": pasos,
+            "errores": [nombre for nombre, res in pasos.items() if res["estado"] == "error"],
+        }
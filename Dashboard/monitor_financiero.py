@@ -4,9 +4,14 @@ import plotly.express as px
 import plotly.graph_objects as go
 from sqlalchemy import create_engine
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import os
 
+from carga_compartida import BackendMemoria, CargaCompartida, Precalentamiento
+import analitica
+import proyecciones
+
 
 load_dotenv()
 # --------------------------------------------------CONFIGURACIÓN DE LA PÁGINA--------------------------------------------------
@@ -131,18 +136,116 @@ st.markdown("""
 # NUEVA CONEXIÓN PARA NEON + STREAMLIT CLOUD
 conn = st.connection("neon", type="sql")
 
+# --------------------------------------------------VERSIÓN DE LOS DATOS--------------------------------------------------
+# Cada corrida del ETL que escribe datos deja una fila en 'etl_runs'. Su id es la
+# "versión" de los datos: las funciones cacheadas la reciben como parámetro, así
+# el cache se invalida una sola vez por cada carga real (y nunca si nada cambió).
+
+# Cada cuánto se vuelve a preguntar por la versión (una consulta de una fila)
+SEGUNDOS_CONSULTA_VERSION = 30
+
+# Tablas que lee el dashboard: cambios en otras tablas no invalidan el cache
+TABLAS_DASHBOARD = ['rendimientos_fci', 'cotizaciones_dolar_hist', 'cotizaciones_dolar', 'inflacion', 'inflacion_diaria']
+
+def obtener_version_datos():
+    """
+    Devuelve la versión actual de los datos del dashboard.
+
+    Returns:
+        str: id de la última corrida del ETL que modificó alguna tabla del dashboard.
+            Si la tabla 'etl_runs' todavía no existe se usa la hora actual
+            (el cache se renueva una vez por hora, como antes).
+    """
+    try:
+        df_version = conn.query(
+            """
+            SELECT COALESCE(MAX(id), 0) AS version
+            FROM etl_runs
+            WHERE filas_modificadas > 0
+              AND tablas && CAST(:tablas AS TEXT[])
+            """,
+            params={"tablas": TABLAS_DASHBOARD},
+            ttl=SEGUNDOS_CONSULTA_VERSION,
+        )
+        return f"etl-{int(df_version['version'].iloc[0])}"
+    except Exception:
+        return f"hora-{pd.Timestamp.now():%Y%m%d%H}"
+
 
 
 # --------------------------------------------------FUNCIONES DE CARGA---------------------------------------------------------
-def cargar_inflacion_real(conn, fecha_inicio, fecha_fin):
+# Inflación mensual (%) que se asume antes del primer mes publicado o sin datos de inflación
+TASA_INFLACION_DEFECTO = 3.0
+
+# Índice diario de inflación entre {inicio} y {fin} (expresiones SQL de tipo DATE)
+QUERY_INDICE_INFLACION = f"""
+SELECT cal.fecha::date AS fecha,
+       CASE WHEN cal.fecha::date < p.fecha
+                THEN p.indice / POWER(1 + {TASA_INFLACION_DEFECTO} / 100, (p.fecha - cal.fecha::date) / 30.0)
+            WHEN cal.fecha::date <= u.fecha THEN d.indice
+            ELSE COALESCE(u.indice, 1.0)
+                 * POWER(1 + COALESCE(u.valor_mensual::float8, {TASA_INFLACION_DEFECTO}) / 100,
+                         (cal.fecha::date - COALESCE(u.fecha, MIN(cal.fecha::date) OVER ())) / 30.0)
+       END AS inflacion_acumulada
+FROM generate_series({{inicio}}, {{fin}}, INTERVAL '1 day') AS cal(fecha)
+LEFT JOIN (
+    SELECT fecha, indice
+    FROM inflacion_diaria
+    ORDER BY fecha
+    LIMIT 1
+) p ON TRUE
+LEFT JOIN (
+    SELECT fecha, valor_mensual, indice
+    FROM inflacion_diaria
+    ORDER BY fecha DESC
+    LIMIT 1
+) u ON TRUE
+LEFT JOIN inflacion_diaria d ON d.fecha = cal.fecha::date
+ORDER BY 1
+"""
+
+def calcular_indice_inflacion_mensual(conn, fecha_inicio, fecha_fin):
     """
-    Obtiene la inflación mensual desde la base de datos y la transforma 
-    en una curva de inflación diaria acumulada (índice).
+    Índice diario de inflación calculado a partir de la tabla mensual 'inflacion'
+    (sin la tabla 'inflacion_diaria' del ETL).
 
     Logica:
     Toma el dato mensual (ej: 4% en enero), lo convierte a una tasa diaria equivalente
     y genera una curva acumulada para poder compararla día a día con otros activos.
 
+    Returns:
+        pd.DataFrame: DataFrame con columnas ['fecha', 'inflacion_acumulada'].
+    """
+    # 1. Obtener datos mensuales de inflación
+    df_inf = conn.query("SELECT fecha, valor::float8 AS valor FROM inflacion ORDER BY fecha ASC", ttl=0)
+    df_inf['fecha'] = pd.to_datetime(df_inf['fecha'])
+    df_inf['anio_mes'] = df_inf['fecha'].dt.to_period('M')
+    df_inf = df_inf.groupby('anio_mes', as_index=False)['valor'].mean()
+
+    # 2. Calendario diario del rango, con el mes de cada día
+    df_diario = pd.DataFrame({'fecha': pd.date_range(start=fecha_inicio, end=fecha_fin, freq='D')})
+    df_diario['anio_mes'] = df_diario['fecha'].dt.to_period('M')
+
+    # 3. Meses sin dato: último valor conocido; sin datos previos, la tasa por defecto
+    df_merged = pd.merge(df_diario, df_inf, on='anio_mes', how='left')
+    df_merged['valor'] = df_merged['valor'].ffill().fillna(TASA_INFLACION_DEFECTO)
+
+    # 4. (1 + TasaMensual)^(1/30) = TasaDiaria, acumulada día a día
+    df_merged['inflacion_acumulada'] = ((1 + df_merged['valor'] / 100) ** (1 / 30)).cumprod()
+
+    return df_merged[['fecha', 'inflacion_acumulada']]
+
+def cargar_indice_inflacion(conn, fecha_inicio, fecha_fin):
+    """
+    Obtiene la curva de inflación diaria acumulada (índice) para un rango de fechas.
+
+    El índice lo calcula el ETL de inflación (tabla 'inflacion_diaria'): el dato
+    mensual convertido a tasa diaria equivalente y acumulado día a día. Acá solo
+    se lee el rango pedido; los días posteriores al último mes publicado se
+    proyectan con la última tasa mensual conocida y los anteriores al primero
+    (o todos, si la tabla está vacía) usan TASA_INFLACION_DEFECTO. Si la tabla
+    todavía no existe se calcula desde los datos mensuales.
+
     Args:
         conn: Conexión a la base de datos (SQLAlchemy).
         fecha_inicio (datetime): Fecha desde donde arranca la serie diaria.
@@ -151,152 +254,342 @@ def cargar_inflacion_real(conn, fecha_inicio, fecha_fin):
     Returns:
         pd.DataFrame: DataFrame con columnas ['fecha', 'inflacion_acumulada'].
     """
-    # 1. Obtener datos mensuales de inflación
-    query = "SELECT fecha, valor FROM inflacion ORDER BY fecha ASC"
-    df_inf = conn.query(query)
+    if not existe_relacion(conn, 'inflacion_diaria'):
+        # El ETL de inflación nuevo todavía no corrió: se arma desde los datos mensuales
+        return calcular_indice_inflacion_mensual(conn, fecha_inicio, fecha_fin)
+
+    df_inf = conn.query(
+        QUERY_INDICE_INFLACION.format(inicio="CAST(:inicio AS DATE)", fin="CAST(:fin AS DATE)"),
+        params={"inicio": pd.Timestamp(fecha_inicio).date(), "fin": pd.Timestamp(fecha_fin).date()},
+        ttl=0,
+    )
     df_inf['fecha'] = pd.to_datetime(df_inf['fecha'])
-    
-    # Crear columna 'anio_mes' para hacer el cruce
-    df_inf['anio_mes'] = df_inf['fecha'].dt.to_period('M')
-    
-    #2. Generar rango de fechas diario completo
-    rango_dias = pd.date_range(start=fecha_inicio, end=fecha_fin, freq='D')
-    df_diario = pd.DataFrame({'fecha': rango_dias})
-    df_diario['anio_mes'] = df_diario['fecha'].dt.to_period('M')
-    
-    #3. Unir datos mensuales al calendario diario
-    df_merged = pd.merge(df_diario, df_inf[['anio_mes', 'valor']], on='anio_mes', how='left')
+    return df_inf
 
-    # Rellenar datos faltantes: 
-    # 'ffill' propaga el último valor conocido. 
-    # 'fillna(3.0)' asume un 3% mensual si no hay datos históricos ni previos
-    df_merged['valor'] = df_merged['valor'].ffill().fillna(3.0) 
-    
-    #4. Calculo financiero: Desagregación mensual a diaria
-    tasa_mensual = df_merged['valor'] / 100
+def cargar_indice_inflacion_ventana(conn, dias):
+    """
+    Igual que cargar_indice_inflacion, pero el rango se calcula en la base a partir
+    de las últimas fechas de FCI y Dólar: cubre todos los días que puede tener la
+    serie consolidada de `dias` días, así la consulta no depende de su resultado
+    y puede correr en paralelo (el join posterior descarta los días de más).
 
-    # Formula de interes compuesto: (1 + TasaMensual)^(1/30) = TasaDiaria
-    df_merged['factor_diario'] = (1 + tasa_mensual) ** (1/30)
+    Returns:
+        pd.DataFrame: DataFrame con columnas ['fecha', 'inflacion_acumulada'].
+    """
+    ultimas = "(SELECT MAX(fecha) FROM rendimientos_fci), (SELECT MAX(fecha) FROM cotizaciones_dolar_hist)"
+    df_inf = conn.query(
+        QUERY_INDICE_INFLACION.format(
+            inicio=f"LEAST({ultimas}) - CAST(:dias AS INTEGER)",
+            fin=f"GREATEST({ultimas})",
+        ),
+        params={"dias": dias},
+        ttl=0,
+    )
+    df_inf['fecha'] = pd.to_datetime(df_inf['fecha'])
+    return df_inf
 
-    # Multiplicar los factores diarios acumulativamente para crear el índice
-    df_merged['inflacion_acumulada'] = df_merged['factor_diario'].cumprod()
-    
-    return df_merged[['fecha', 'inflacion_acumulada']]
+# Días hacia atrás que usan las pestañas para estimar la TNA reciente de cada FCI
+# (una de las ventanas de la tabla de estadísticas, ver analitica.VENTANAS_TNA)
+DIAS_ESTIMACION_TNA = 30
+
+# Historial de VCP para las estadísticas por fondo y la simulación Monte Carlo
+DIAS_HISTORIAL = 365
+
+# Margen extra para que el ffill tenga el dato previo a fines de semana y feriados
+DIAS_MARGEN = 7
+
+
+def dias_a_consultar(dias_filtro):
+    """Ventana que se pide a la base: lo visible más el margen (las TNA salen de la tabla de estadísticas)"""
+    return dias_filtro + DIAS_MARGEN
+
+# Billeteras que se muestran en el dashboard
+BILLETERAS = ['Mercado Pago', 'Ualá', 'Personal Pay']
+
+
+def _columna_sql(nombre):
+    """Nombre de columna entre comillas dobles (los nombres vienen de la base: 'Dólar Contado con liquidación')"""
+    return '"' + nombre.replace('"', '""') + '"'
 
-@st.cache_data(ttl=3600) # -->Cachear (guardar en memoria) el resultado por 1 hora para optimizar velocidad
 
+def construir_query_consolidada(billeteras, tipos_dolar, metrica_fci, dias):
+    """
+    Arma la consulta que devuelve la serie consolidada ya pivoteada:
+    una fila por día y una columna por billetera y por tipo de dólar.
+
+    PASOS (todo en la base):
+        1. FCI: VCP, o TNA convertida a rendimiento acumulado base 100 por billetera.
+        2. Pivot con agregados condicionales (AVG ... FILTER) por billetera y por tipo de dólar.
+        3. Calendario diario (generate_series) entre la primera y la última fecha.
+        4. Relleno hacia adelante: cada hueco toma el último valor conocido de su columna
+           (si no hay cotización el fin de semana, usa la del viernes).
+        5. Se descartan los primeros días en los que alguna columna todavía no tiene dato.
+
+    Returns:
+        tuple: (query, params) para conn.query
+    """
+    params = {"dias": dias}
+    columnas = []       # (alias en la salida, expresión del pivot, CTE de origen)
+
+    for i, billetera in enumerate(billeteras):
+        params[f"b{i}"] = billetera
+        columnas.append((billetera, f"AVG(valor) FILTER (WHERE billetera = :b{i})", "f"))
+    for i, tipo in enumerate(tipos_dolar):
+        params[f"t{i}"] = tipo
+        columnas.append((f"Dólar {tipo}", f"AVG(venta::float8) FILTER (WHERE tipo = :t{i})", "d"))
+
+    if metrica_fci == 'tna':
+        # Interés compuesto diario: producto de (1 + TNA/100/365) como suma de logaritmos,
+        # normalizado para que cada billetera arranque en 100 el primer día
+        valor_fci = """
+            100 * EXP(
+                SUM(LN(1 + COALESCE(tna, 0)::float8 / 100 / 365)) OVER w
+                - FIRST_VALUE(LN(1 + COALESCE(tna, 0)::float8 / 100 / 365)) OVER w
+            )"""
+    else:
+        valor_fci = "vcp::float8"
+
+    pivot_fci = ", ".join(f"{expr} AS c{i}" for i, (_, expr, origen) in enumerate(columnas) if origen == "f")
+    pivot_dolar = ", ".join(f"{expr} AS c{i}" for i, (_, expr, origen) in enumerate(columnas) if origen == "d")
+    cols_base = ", ".join(f"{origen}.c{i}" for i, (_, _, origen) in enumerate(columnas))
+    grupos = ", ".join(f"COUNT({origen}.c{i}) OVER (ORDER BY cal.fecha) AS g{i}" for i, (_, _, origen) in enumerate(columnas))
+    relleno = ", ".join(
+        f"MAX(c{i}) OVER (PARTITION BY g{i}) AS {_columna_sql(alias)}" for i, (alias, _, _) in enumerate(columnas)
+    )
+    completos = " AND ".join(f"{_columna_sql(alias)} IS NOT NULL" for alias, _, _ in columnas) or "TRUE"
+
+    if tipos_dolar:
+        dolar_sql = f"""
+        SELECT fecha, {pivot_dolar}
+        FROM cotizaciones_dolar_hist
+        WHERE fecha >= (SELECT MAX(fecha) FROM cotizaciones_dolar_hist) - CAST(:dias AS INTEGER)
+        GROUP BY fecha
+        """
+    else:
+        # Sin tipos de dólar no se toca la tabla (puede no existir)
+        dolar_sql = "SELECT NULL::date AS fecha WHERE FALSE"
+
+    query = f"""
+    WITH fci AS (
+        SELECT fecha, billetera, {valor_fci} AS valor
+        FROM rendimientos_fci
+        WHERE billetera IN ({', '.join(f':b{i}' for i in range(len(billeteras))) or 'NULL'})
+          AND fecha >= (SELECT MAX(fecha) FROM rendimientos_fci) - CAST(:dias AS INTEGER)
+        WINDOW w AS (PARTITION BY billetera ORDER BY fecha ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW)
+    ),
+    pivot_fci AS (
+        SELECT fecha{', ' + pivot_fci if pivot_fci else ''}
+        FROM fci
+        GROUP BY fecha
+    ),
+    pivot_dolar AS ({dolar_sql}),
+    fechas AS (
+        SELECT fecha FROM pivot_fci UNION SELECT fecha FROM pivot_dolar
+    ),
+    calendario AS (
+        SELECT generate_series(MIN(fecha), MAX(fecha), INTERVAL '1 day')::date AS fecha
+        FROM fechas
+    ),
+    base AS (
+        SELECT cal.fecha{', ' + cols_base if cols_base else ''}{', ' + grupos if grupos else ''}
+        FROM calendario cal
+        LEFT JOIN pivot_fci f ON f.fecha = cal.fecha
+        LEFT JOIN pivot_dolar d ON d.fecha = cal.fecha
+    ),
+    relleno AS (
+        SELECT fecha{', ' + relleno if relleno else ''}
+        FROM base
+    )
+    SELECT *
+    FROM relleno
+    WHERE {completos}
+    ORDER BY fecha
+    """
+    return query, params
 
-def obtener_datos_consolidados(metrica_fci='vcp'):
+def leer_vista_consolidada(conn, metrica_fci, dias):
+    """
+    Lee la serie consolidada de la vista materializada que refresca el ETL.
+
+    La vista ya trae el calendario diario relleno para FCI, Dólar e Inflación:
+    acá solo queda un range scan por fecha y pasar las series a columnas.
+
+    Returns:
+        pd.DataFrame: Mismo formato que obtener_datos_consolidados.
+    """
+    columna = 'tna_acumulado' if metrica_fci == 'tna' else 'vcp'
+    df_largo = conn.query(
+        f"""
+        SELECT fecha, serie, {columna} AS valor
+        FROM serie_consolidada
+        WHERE fecha >= (SELECT MAX(fecha) FROM serie_consolidada) - CAST(:dias AS INTEGER)
+        ORDER BY fecha
+        """,
+        params={"dias": dias},
+        ttl=0,
+    )
+    df_largo['fecha'] = pd.to_datetime(df_largo['fecha'])
+    # Pocas series repetidas en muchas filas: categórica ocupa un código por fila en vez de un string
+    df_largo['serie'] = df_largo['serie'].astype('category')
+
+    # Pivot, orden de columnas (billeteras, dólares, inflación) y re-base de la TNA acumulada
+    df_cons = analitica.consolidar_series(df_largo, BILLETERAS, normalizar_billeteras=(metrica_fci == 'tna'))
+    billeteras = [c for c in df_cons.columns if c in BILLETERAS]
+    dolares = [c for c in df_cons.columns if c.startswith('Dólar ')]
+
+    if not dolares:
+        #Crea un dato para que no rompa el gráfico
+        df_cons.insert(len(billeteras), 'Dólar Blue', 1200.0)
+
+    return df_cons
+
+
+@st.cache_resource # -->Una sola instancia por proceso: la comparten todas las sesiones
+def obtener_carga_compartida():
+    # Backend entre réplicas según DASHBOARD_CACHE ('memoria' o 'parquet')
+    return CargaCompartida()
+
+
+def obtener_datos_consolidados(metrica_fci='vcp', dias=dias_a_consultar(90), version=None):
     """
     Descarga, procesa y unifica datos de FCIs, Dólar e Inflación en un solo DataFrame.
 
+    Lee la vista materializada 'serie_consolidada' (un único range scan). Si la
+    vista todavía no existe (el ETL nuevo no corrió) se arma desde las tablas.
+
+    El resultado se comparte entre sesiones (ver CargaCompartida): cuando cambia
+    la versión, una sola sesión dispara la recarga en segundo plano y mientras
+    tanto todas siguen viendo los datos anteriores.
+
     Args:
         metrica_fci (str): 
             - 'vcp': Usa el Valor de Cuotaparte (precio real).
             - 'tna': Usa la Tasa Nominal Anual y simula el rendimiento acumulado.
+        dias (int): Días hacia atrás desde la última fecha cargada (ver dias_a_consultar).
+        version (str): Versión de los datos (ver obtener_version_datos). Cuando el ETL
+            carga datos nuevos cambia y se recalcula.
 
     Returns:
         pd.DataFrame: Tabla con fechas como índice y columnas para cada activo 
                     (Billeteras, Tipos de Dólar, Inflación).
     """
     conn = st.connection("neon", type="sql")
-    
-    # ---------------------------------------------------------
-    # 1. CARGA Y PROCESAMIENTO DE FCI (Billeteras)
-    # ---------------------------------------------------------
-    q_fci = f"""
-    SELECT fecha, billetera, vcp, tna 
-    FROM rendimientos_fci 
-    WHERE billetera IN ('Mercado Pago', 'Ualá', 'Personal Pay')
-    ORDER BY fecha ASC
-    """
-    df_fci = conn.query(q_fci, ttl="10m")
-    df_fci['fecha'] = pd.to_datetime(df_fci['fecha'])
-    
-    #logica condicional según qué métrica quiere ver el usuario
-    if metrica_fci == 'tna':
-        # Convertir TNA (anual %) a rendimiento acumulado
-        # TNA es anual, lo dividimos por 365 para tasa diaria
-        # Luego acumulamos día a día por billetera
-        
-        df_fci['tna'] = df_fci['tna'].fillna(0)  # Rellenar NaN con 0 (Limpieza de nulos)
 
-        #Convertir TNA (Anual) a factor diario: (1 + Tasa / 100 / 365)
-        df_fci['tasa_diaria'] = (1 + df_fci['tna'] / 100 / 365)
-        
-        # Calcular el crecimiento compuesto acumulado por cada billetera
-        df_fci = df_fci.sort_values(['billetera', 'fecha'])
-        df_fci['rendimiento_acumulado'] = df_fci.groupby('billetera')['tasa_diaria'].cumprod()
-        
-        # NORMALIZACIÓN (Base 100):
-        # Hace que todas las curvas empiecen en 100 el primer día para poder compararlas visualmente
-        for billetera in df_fci['billetera'].unique():
-            mask = df_fci['billetera'] == billetera
+    def _cargar():
+        return cargar_consolidado(conn, metrica_fci, dias)
 
-            # Tomamos el primer valor de la serie
-            primer_valor = df_fci.loc[mask, 'rendimiento_acumulado'].iloc[0]
+    df_cons = obtener_carga_compartida().obtener((metrica_fci, dias), version, _cargar)
+    # Copia por sesión: el DataFrame compartido no se modifica nunca
+    return df_cons.copy()
 
-            # re-escalamos toda la serie dividiendo por el primer valor
-            df_fci.loc[mask, 'rendimiento_acumulado'] = (
-                df_fci.loc[mask, 'rendimiento_acumulado'] / primer_valor * 100
-            )
-        
-        # Pivotear: Convertir billeteras de filas a columnas
-        df_fci_pivot = df_fci.pivot_table(
-            index='fecha', 
-            columns='billetera', 
-            values='rendimiento_acumulado'
-        )
+
+def existe_relacion(conn, nombre):
+    """True si la tabla o vista `nombre` existe (las vistas las crea el ETL en su primera corrida)"""
+    df = conn.query("SELECT to_regclass(:nombre) IS NOT NULL AS existe", params={"nombre": nombre}, ttl=0)
+    return bool(df['existe'].iloc[0])
+
+
+def cargar_consolidado(conn, metrica_fci, dias):
+    """
+    Consulta la serie consolidada sin pasar por el cache: de la vista materializada
+    o, si todavía no existe, desde las tablas.
+
+    Returns:
+        pd.DataFrame: Mismo formato que obtener_datos_consolidados.
+    """
+    # Solo la falta de la vista lleva al armado desde tablas: cualquier otro error se propaga
+    if existe_relacion(conn, 'serie_consolidada'):
+        df = leer_vista_consolidada(conn, metrica_fci, dias)
     else:
-        # CASO VCP: Usar el valor de cuotaparte directo --> (ya es acumulativo)
-        df_fci_pivot = df_fci.pivot_table(
-            index='fecha', 
-            columns='billetera', 
-            values='vcp'
-        )
-    
+        df = armar_consolidado_desde_tablas(conn, metrica_fci, dias)
+    # Las consultas ya castean a float8; esto garantiza float64 nativo (nunca Decimal/object)
+    return df.astype('float64')
+
+
+# Consultas a la base que pueden correr al mismo tiempo (dentro del pool de SQLAlchemy)
+CONSULTAS_EN_PARALELO = 3
+
+@st.cache_resource # -->Un solo pool de hilos por proceso
+def obtener_pool_consultas():
+    return ThreadPoolExecutor(max_workers=CONSULTAS_EN_PARALELO, thread_name_prefix="consultas_dashboard")
+
+
+def armar_consolidado_desde_tablas(conn, metrica_fci, dias):
+    """
+    Arma la serie consolidada directamente desde las tablas crudas.
+
+    Solo se traen los últimos `dias` días de cada tabla (el filtro corre en SQL),
+    así cada consulta transfiere una cantidad acotada de filas aunque el historial crezca.
+    Las consultas que no dependen entre sí corren en paralelo: en frío se pagan dos
+    idas y vueltas a la base (lecturas independientes + serie pivoteada) en vez de cuatro.
+
+    Corre en el hilo de carga de CargaCompartida (sin contexto de Streamlit): los
+    avisos no se muestran acá, viajan con el resultado en df.attrs['avisos'] y
+    los muestra la sesión.
+
+    Returns:
+        pd.DataFrame: Mismo formato que obtener_datos_consolidados.
+    """
+    avisos = []
+
     # ---------------------------------------------------------
-    # 2. CARGA Y PROCESAMIENTO DE DOLAR
+    # 1. LECTURAS INDEPENDIENTES EN PARALELO
+    #    (Billeteras y tipos de Dólar de la ventana + índice de inflación)
     # ---------------------------------------------------------
-    try:
-        q_dolar = """
-        SELECT fecha, tipo, venta 
-        FROM cotizaciones_dolar_hist 
-        ORDER BY fecha ASC
+    pool = obtener_pool_consultas()
+    futuro_billeteras = pool.submit(
+        conn.query,
+        f"""
+        SELECT DISTINCT billetera
+        FROM rendimientos_fci
+        WHERE billetera IN ({', '.join(f':b{i}' for i in range(len(BILLETERAS)))})
+          AND fecha >= (SELECT MAX(fecha) FROM rendimientos_fci) - CAST(:dias AS INTEGER)
+        """,
+        params={"dias": dias, **{f"b{i}": b for i, b in enumerate(BILLETERAS)}},
+        ttl=0,
+    )
+    futuro_dolar = pool.submit(
+        conn.query,
         """
-        df_dolar = conn.query(q_dolar, ttl="10m")
-        df_dolar['fecha'] = pd.to_datetime(df_dolar['fecha'])
-        
-        # Agrupar por día y tipo para obtener promedio (evita duplicados o zig-zag)
-        df_dolar = df_dolar.groupby(['fecha', 'tipo'])['venta'].mean().reset_index()
-        
-        # Pivotear tipos de dolar a columnas (Blue, Oficial, MEP, etc.)
-        df_dolar_pivot = df_dolar.pivot_table(
-            index='fecha', 
-            columns='tipo', 
-            values='venta'
-        )
-        
-        # Renombrar columnas para que sean mas claras
-        df_dolar_pivot.columns = [f'Dólar {col}' for col in df_dolar_pivot.columns]
-        
+        SELECT DISTINCT tipo
+        FROM cotizaciones_dolar_hist
+        WHERE fecha >= (SELECT MAX(fecha) FROM cotizaciones_dolar_hist) - CAST(:dias AS INTEGER)
+        """,
+        params={"dias": dias},
+        ttl=0,
+    )
+    futuro_inflacion = pool.submit(cargar_indice_inflacion_ventana, conn, dias)
+
+    billeteras = sorted(futuro_billeteras.result()['billetera'])
+
+    try:
+        tipos_dolar = sorted(futuro_dolar.result()['tipo'])
     except Exception as e:
         # Manejo de errores si falla la DB o la tabla no existe
-        st.warning(f"No se pudo cargar el dólar: {e}. Usando simulado.")
+        avisos.append(f"No se pudo cargar el dólar: {e}. Usando simulado.")
+        tipos_dolar = []
+
+    # ---------------------------------------------------------
+    # 2. SERIE CONSOLIDADA ARMADA EN LA BASE (pivot + calendario + ffill)
+    # ---------------------------------------------------------
+    query, params = construir_query_consolidada(billeteras, tipos_dolar, metrica_fci, dias)
+    df_cons = conn.query(query, params=params, ttl=0)
+    df_cons['fecha'] = pd.to_datetime(df_cons['fecha'])
+    df_cons = df_cons.set_index('fecha')
+
+    if not tipos_dolar:
         #Crea un dato para que no rompa el gráfico
-        df_dolar_pivot = pd.DataFrame({'Dólar Blue': 1200}, index=df_fci_pivot.index)
-    
+        df_cons['Dólar Blue'] = 1200.0
 
     # ---------------------------------------------------------
     # 3. UNIFICACION FINAL (FCI + Dolar + Inflacion)
     # ---------------------------------------------------------
 
-    # Unir FCI y Dólar por fecha (outer join para no perder días si faltan datos en uno)
-    df_cons = df_fci_pivot.join(df_dolar_pivot, how='outer')
-    df_cons = df_cons.ffill().dropna() # --> Rellenar huecos hacia adelante (si no hay cotización fin de semana, usa la del viernes)
-    
-    # Calcular Inflacion para el rango de fechas resultante
-    df_inf = cargar_inflacion_real(conn, df_cons.index.min(), df_cons.index.max())
+    # Inflacion ya consultada en paralelo; sin tabla de dólar se pide para el rango resultante
+    try:
+        df_inf = futuro_inflacion.result()
+    except Exception:
+        df_inf = cargar_indice_inflacion(conn, df_cons.index.min(), df_cons.index.max())
 
     # Unir Inflacion al consolidado
     df_cons = df_cons.join(df_inf.set_index('fecha'), how='left')
@@ -304,9 +597,170 @@ def obtener_datos_consolidados(metrica_fci='vcp'):
     # Renombrar para visualizacion
     if 'inflacion_acumulada' in df_cons.columns:
         df_cons = df_cons.rename(columns={'inflacion_acumulada': 'Inflación'})
-        
+
+    # attrs se conserva en copias, astype y en el Parquet del cache compartido
+    df_cons.attrs['avisos'] = avisos
     return df_cons
 
+def obtener_cotizaciones_hoy(version=None):
+    """
+    Cotizaciones del día de la tabla 'cotizaciones_dolar'.
+
+    Se cachea igual que obtener_datos_consolidados (compartido entre sesiones y réplicas).
+
+    Args:
+        version (str): Versión de los datos (ver obtener_version_datos), clave del cache.
+
+    Returns:
+        pd.DataFrame: Columnas ['tipo' (categórica), 'compra', 'venta', 'promedio' (float64), 'fecha'].
+    """
+    conn = st.connection("neon", type="sql")
+    #Nota sobre la Query:
+    # usamos una sentencia CASE en el ORDER BY.
+    # Esto ordena por "Relevancia".
+    # Queremos que el Oficial, Blue y MEP salgan siempre primero, sin importar su nombre.
+    # Los NUMERIC se castean a float8: pandas los recibe como float64 y no como Decimal
+    query_cotizaciones = """
+    SELECT tipo, compra::float8 AS compra, venta::float8 AS venta, promedio::float8 AS promedio, fecha
+    FROM cotizaciones_dolar
+    ORDER BY 
+        CASE tipo
+            WHEN 'Oficial' THEN 1
+            WHEN 'Blue' THEN 2
+            WHEN 'MEP' THEN 3
+            WHEN 'CCL' THEN 4
+            WHEN 'Cripto' THEN 5
+            ELSE 6
+        END
+    """
+    def _cargar():
+        df = conn.query(query_cotizaciones, ttl=0)
+        df['tipo'] = df['tipo'].astype('category')
+        return df
+
+    df_cotizaciones = obtener_carga_compartida().obtener(('cotizaciones_dolar',), version, _cargar)
+    return df_cotizaciones.copy()
+
+# --------------------------------------------------ESTADÍSTICAS POR FONDO--------------------------------------------------
+def leer_estadisticas_fondos(conn):
+    """
+    Lee la vista materializada 'estadisticas_fondos' que refresca el ETL.
+
+    Returns:
+        pd.DataFrame: Mismo formato que analitica.estadisticas_fondos.
+    """
+    df_est = conn.query(
+        """
+        SELECT fondo, tna_7d, tna_30d, tna_90d, volatilidad, ultimo_vcp
+        FROM estadisticas_fondos
+        """,
+        ttl=0,
+    )
+    return df_est.set_index('fondo')
+
+
+def obtener_estadisticas_fondos(version=None):
+    """
+    Tabla de estadísticas por fondo (TNA de 7/30/90 días, volatilidad, último VCP).
+
+    Se arma una sola vez por versión de los datos y la comparten todas las pestañas
+    y sesiones (ver CargaCompartida). Si la vista del ETL todavía no existe se
+    calcula con el historial de VCP.
+
+    Args:
+        version (str): Versión de los datos (ver obtener_version_datos), clave del cache.
+
+    Returns:
+        pd.DataFrame: Índice fondo; columnas 'tna_7d', 'tna_30d', 'tna_90d', 'volatilidad', 'ultimo_vcp'.
+    """
+    conn = st.connection("neon", type="sql")
+
+    def _cargar():
+        if existe_relacion(conn, 'estadisticas_fondos'):
+            df_est = leer_estadisticas_fondos(conn)
+        else:
+            df_est = analitica.estadisticas_fondos(cargar_consolidado(conn, 'vcp', DIAS_HISTORIAL))
+        return df_est.astype('float64')
+
+    df_est = obtener_carga_compartida().obtener(('estadisticas_fondos',), version, _cargar)
+    return df_est.copy()
+
+
+# --------------------------------------------------SIMULACIÓN MONTE CARLO--------------------------------------------------
+# Simulaciones guardadas (cada combinación de fondo, capital, aporte y plazo es una entrada)
+MAX_SIMULACIONES = 32
+
+@st.cache_resource # -->Cache propio: las simulaciones no desplazan a los datos de la base
+def obtener_cache_simulaciones():
+    return CargaCompartida(max_entradas=MAX_SIMULACIONES, backend=BackendMemoria())
+
+
+def obtener_bandas_montecarlo(fci, capital, aporte, meses, ajustar_inflacion=False, version=None):
+    """
+    Bandas P5/P50/P95 del capital mes a mes sorteando rendimientos del historial del FCI.
+
+    Args:
+        fci (str): Billetera a simular.
+        capital, aporte (float): Capital inicial y aporte mensual.
+        meses (int): Plazo de la proyección.
+        ajustar_inflacion (bool): Rendimientos reales (capital en pesos de hoy).
+        version (str): Versión de los datos (ver obtener_version_datos).
+
+    Returns:
+        pd.DataFrame: Columnas ['Mes', 'P5', 'P50', 'P95'] (ver proyecciones.simular_montecarlo).
+    """
+    df_historial = obtener_datos_consolidados('vcp', DIAS_HISTORIAL, version)
+    inflacion = df_historial[analitica.COLUMNA_INFLACION] if ajustar_inflacion else None
+    rendimientos = proyecciones.rendimientos_diarios(df_historial[fci], inflacion)
+
+    def _simular():
+        return proyecciones.simular_montecarlo(rendimientos, capital, aporte, meses)
+
+    clave = ('montecarlo', fci, capital, aporte, meses, ajustar_inflacion)
+    return obtener_cache_simulaciones().obtener(clave, version, _simular).copy()
+
+
+def agregar_bandas_montecarlo(fig, bandas, ajustar_inflacion=False):
+    """Agrega al gráfico el rango P5-P95 (área sombreada) y la mediana de la simulación"""
+    sufijo = " (pesos de hoy)" if ajustar_inflacion else ""
+    fig.add_trace(go.Scatter(
+        x=bandas['Mes'], y=bandas['P95'],
+        mode='lines', line=dict(width=0),
+        name=f'Monte Carlo P95{sufijo}', showlegend=False
+    ))
+    fig.add_trace(go.Scatter(
+        x=bandas['Mes'], y=bandas['P5'],
+        mode='lines', line=dict(width=0),
+        fill='tonexty', fillcolor='rgba(167, 139, 250, 0.25)',
+        name=f'Rango probable P5-P95{sufijo}'
+    ))
+    fig.add_trace(go.Scatter(
+        x=bandas['Mes'], y=bandas['P50'],
+        mode='lines', line=dict(color='#a78bfa', width=2, dash='dot'),
+        name=f'Mediana Monte Carlo{sufijo}'
+    ))
+
+
+# --------------------------------------------------PRECALENTAMIENTO--------------------------------------------------
+# La primera ejecución del script en el proceso lanza (una sola vez) un hilo que
+# despierta la base de Neon, abre el pool de conexiones y carga lo que pide la vista
+# inicial: las dos métricas con la ventana por defecto y las cotizaciones del día.
+# Las sesiones no lo esperan: si piden algo que se está cargando se suman a esa carga.
+
+@st.cache_resource # -->Una sola vez por proceso
+def iniciar_precalentamiento():
+    conn = st.connection("neon", type="sql")
+    pasos = [
+        ("conexion", lambda: conn.query("SELECT 1", ttl=0)),
+        ("vcp", lambda: obtener_datos_consolidados('vcp', dias_a_consultar(90), obtener_version_datos())),
+        ("tna", lambda: obtener_datos_consolidados('tna', dias_a_consultar(90), obtener_version_datos())),
+        ("cotizaciones", lambda: obtener_cotizaciones_hoy(obtener_version_datos())),
+        ("estadisticas", lambda: obtener_estadisticas_fondos(obtener_version_datos())),
+    ]
+    return Precalentamiento(pasos).iniciar()
+
+precalentamiento = iniciar_precalentamiento()
+
 # --------------------------------------------------SIDEBAR (PRIMERO - antes de cargar datos)--------------------------------------------------
 st.sidebar.header("⚙️ Configuración")
 
@@ -323,7 +777,11 @@ dias_filtro = st.sidebar.slider("Días a visualizar", 7 , 30, 90)
 
 
 try:
-    df = obtener_datos_consolidados(metrica_fci=metrica_seleccionada)
+    version_datos = obtener_version_datos()
+    df = obtener_datos_consolidados(metrica_fci=metrica_seleccionada, dias=dias_a_consultar(dias_filtro), version=version_datos)
+    # Avisos de la carga (se armó en segundo plano, acá recién hay sesión para mostrarlos)
+    for aviso in df.attrs.get('avisos', []):
+        st.warning(aviso)
     
     # Obtener tipos de dólar disponibles
     tipos_dolar = [col for col in df.columns if col.startswith('Dólar')]
@@ -344,6 +802,15 @@ except Exception as e:
     st.error(f"Error conectando a la base de datos: {e}")
     st.stop()
 
+# ESTADO DEL PRECALENTAMIENTO (datos en cache listos para todas las sesiones)
+estado_precalentamiento = precalentamiento.resumen()
+if not estado_precalentamiento['listo']:
+    st.sidebar.caption("⏳ Precalentando datos...")
+elif estado_precalentamiento['errores']:
+    st.sidebar.caption(f"⚠️ Precalentamiento con errores: {', '.join(estado_precalentamiento['errores'])}")
+else:
+    st.sidebar.caption(f"🔥 Datos en cache ({estado_precalentamiento['segundos']:.1f}s de precalentamiento)")
+
 # Selector de instrumentos (después de tener df)
 # filtra para no mostrar todos los tipos de dólar, solo el seleccionado
 instrumentos_disponibles = [c for c in df.columns if c != 'Inflación']
@@ -365,7 +832,7 @@ instrumentos = st.sidebar.multiselect(
 # INFORMACION IMPORTANTE
 with st.sidebar:
     st.header("Información IMPORTANTE")
-    st.warning("La proyección asume TNA constante. Los rendimientos pasados no garantizan futuros.")
+    st.warning("La proyección asume TNA constante (la simulación Monte Carlo, meses repetidos del historial). Los rendimientos pasados no garantizan futuros.")
     st.markdown("---")
 
 # ----------------------------------------------------- UI DE LA APLICACIÓN --------------------------------------------------
@@ -379,12 +846,17 @@ else:
 
 
 # Filtrar por días
-fecha_corte = df.index.max() - pd.Timedelta(days=dias_filtro)
-df_filtrado = df[df.index >= fecha_corte].copy()
+df_filtrado = analitica.filtrar_ventana(df, dias_filtro)
 
 # -------------------------------------------------- NORMALIZACIÓN DINÁMICA (Base 100) --------------------------------------------------
 
-df_norm = (df_filtrado / df_filtrado.iloc[0]) * 100
+df_norm = analitica.normalizar_base_100(df_filtrado)
+
+# Estadísticas de cada FCI (una fila por fondo), calculadas una vez por versión de los datos
+estadisticas_fondos = obtener_estadisticas_fondos(version_datos)
+
+# TNA reciente de cada FCI (últimos 30 días), la misma para todas las pestañas
+tnas_estimadas = analitica.tna_para_proyeccion(estadisticas_fondos, analitica.columnas_fci(df), dias=DIAS_ESTIMACION_TNA)
 
 # ---------------------------------------------------------KPIS---------------------------------------------------------------------------------
 
@@ -406,20 +878,17 @@ st.markdown("""
 # Dividimos la pantalla en 4 columnas de igual ancho para los 4 indicadores
 col1, col2, col3, col4 = st.columns(4)
 
+# Variación de cada columna en el periodo (último valor de base 100 - 100)
+rendimientos = analitica.rendimientos_periodo(df_norm)
+
 # A. Inflación
-# Tomamos el último valor (.iloc[-1]) de la columna Inflación y restamos la base.
-rend_infla = df_norm['Inflación'].iloc[-1] - 100
+rend_infla = rendimientos['Inflación']
 
 # B. Dólar
-rend_dolar = df_norm[tipo_dolar_seleccionado].iloc[-1] - 100 if tipo_dolar_seleccionado and tipo_dolar_seleccionado in df_norm else 0
-
-# C. Mejor FCI (Billetera)
-# Filtramos las columnas para excluir Inflación y Dólares, quedándonos solo con las Billeteras
-fci_cols = [c for c in df_norm.columns if c not in ['Inflación', 'dolar_blue']]
-mejor_fci_nombre = df_norm[fci_cols].iloc[-1].idxmax() #.idxmax() devuelve el NOMBRE de la columna con el valor más alto en la última fila
+rend_dolar = rendimientos[tipo_dolar_seleccionado] if tipo_dolar_seleccionado and tipo_dolar_seleccionado in rendimientos else 0
 
-# Obtenemos el valor numérico de ese mejor rendimiento.
-mejor_fci_val = df_norm[mejor_fci_nombre].iloc[-1] - 100
+# C. Mejor FCI (Billetera): solo compiten las billeteras, sin Inflación ni Dólares
+mejor_fci_nombre, mejor_fci_val = analitica.mejor_fondo(rendimientos, analitica.columnas_fci(df_norm))
 
 #---VISUALIZACIÓN DE KPIS---
 
@@ -498,57 +967,37 @@ with tab1:
     # ----------------------- 2. LOGICA DE CÁLCULO -----------------------
     if fci_proyeccion:
         # A. ESTIMACION DE LA TASA (TNA)
-        # obtine TNA promedio de los últimos 30 días del FCI seleccionado
-        try:
-            # Filtrar últimos 30 días para calcular TNA promedio reciente
-            fecha_limite = df.index.max() - pd.Timedelta(days=30)
-            # Filtramos el DF para quedarnos solo con el último mes
-            df_reciente = df[df.index >= fecha_limite]
-            
-            # Calcular TNA a partir del VCP o datos disponibles
-            # Aproximamos TNA observando el crecimiento diario
-            valores_fci = df_reciente[fci_proyeccion].dropna()
-            
-            if len(valores_fci) > 1:
-                # CALCULO DE RENDIMIENTO DIARIO PROMEDIO --->(Geométrico)
-                # Fórmula: (ValorFinal / ValorInicial) ^ (1 / cantidad_dias) - 1
-                rendimiento_diario = (valores_fci.iloc[-1] / valores_fci.iloc[0]) ** (1/len(valores_fci)) - 1
-                # Anualizamos la tasa diaria para obtener la TNA (Tasa Nominal Anual)
-                tna_estimada = rendimiento_diario * 365 * 100
-            else:
-                tna_estimada = 35.0  # ---->Default conservador si no hay suficientes datos
-            
-            # CLAMPING (Límites de seguridad):
-            # Forzamos a que la tasa esté entre 20% y 60% para evitar proyecciones irreales
-            # si el fondo tuvo una semana muy buena o muy mala.
-            tna_estimada = max(20, min(tna_estimada, 60))
-            
-        except:
-            tna_estimada = 35.0  # Default de seguridad ante errores
-        
+        # TNA promedio de los últimos 30 días del FCI seleccionado (rendimiento diario
+        # geométrico anualizado, limitado entre 20% y 60%; sale de la tabla de estadísticas)
+        tna_estimada = tnas_estimadas[fci_proyeccion]
         
         # Mostrar TNA estimada
         st.info(f"📊 **TNA estimada del fondo:** {tna_estimada:.2f}% anual (basada en rendimiento reciente)")
-        
-        # PROYECCIÓN MES A MES (Interés Compuesto)
-        proyeccion_meses = []
-        capital_actual = capital_inicial
 
-        # Convertimos TNA a Tasa Mensual Efectiva para el bucle
-        tasa_mensual = tna_estimada / 100 / 12 
-        
-        # Bucle para simular el paso del tiempo
-        for mes in range(meses_proyeccion + 1):
-            proyeccion_meses.append({
-                'Mes': mes,
-                'Capital': capital_actual,
-                'Ganancia Acumulada': capital_actual - capital_inicial
-            })
-            #formula de interés compuesto: Capital * (1 + tasa)
-            capital_actual = capital_actual * (1 + tasa_mensual)
+        # Modo Monte Carlo (opcional): además de la TNA fija, rendimientos sorteados del historial del fondo
+        col_mc1, col_mc2 = st.columns(2)
+        usar_montecarlo = col_mc1.checkbox(
+            "🎲 Simulación Monte Carlo",
+            key="montecarlo",
+            help="Simula 100.000 escenarios con meses reales del historial del fondo y muestra el rango probable"
+        )
+        ajustar_inflacion_mc = col_mc2.checkbox(
+            "🧠 En pesos de hoy (descontando inflación)",
+            key="montecarlo_inflacion",
+            disabled=not usar_montecarlo
+        )
+        bandas_mc = None
+        if usar_montecarlo:
+            try:
+                bandas_mc = obtener_bandas_montecarlo(fci_proyeccion, capital_inicial, 0, meses_proyeccion, ajustar_inflacion_mc, version_datos)
+            except (KeyError, ValueError) as e:
+                st.warning(f"No se pudo simular con el historial del fondo: {e}")
         
-        #Convertimos la lista de diccionarios en DataFrame para graficar fácil
-        df_proyeccion = pd.DataFrame(proyeccion_meses)
+        # PROYECCIÓN MES A MES (Interés Compuesto)
+        # Fórmula cerrada para todos los meses a la vez: Capital * (1 + TNA/12)^mes
+        df_proyeccion = proyecciones.tabla_proyeccion(capital_inicial, 0, tna_estimada, meses_proyeccion)
+        df_proyeccion = df_proyeccion.rename(columns={'Ganancia por Interés': 'Ganancia Acumulada'})
+        df_proyeccion = df_proyeccion[['Mes', 'Capital', 'Ganancia Acumulada']]
         
         # ----------------------- 3. RESULTADOS (KPIs) -----------------------
         capital_final = df_proyeccion['Capital'].iloc[-1]
@@ -599,6 +1048,10 @@ with tab1:
             name='Capital Inicial',
             line=dict(color='gray', width=2, dash='dash')
         ))
+
+        # Trazo 3 (Monte Carlo): rango P5-P95 y mediana de los escenarios simulados
+        if bandas_mc is not None:
+            agregar_bandas_montecarlo(fig_proyeccion, bandas_mc, ajustar_inflacion_mc)
         
         fig_proyeccion.update_layout(
             title=f"Proyección de ${capital_inicial:,.0f} en {fci_proyeccion}",
@@ -609,6 +1062,13 @@ with tab1:
         )
         
         st.plotly_chart(fig_proyeccion, use_container_width=True)
+
+        if bandas_mc is not None:
+            final_mc = bandas_mc.iloc[-1]
+            st.caption(
+                f"🎲 Capital final según el historial{' (pesos de hoy)' if ajustar_inflacion_mc else ''}: "
+                f"P5 ${final_mc['P5']:,.0f} · Mediana ${final_mc['P50']:,.0f} · P95 ${final_mc['P95']:,.0f}"
+            )
         
         # ----------------------- 5. TABLA DE DATOS -----------------------
         with st.expander("📋 Ver tabla detallada mes a mes"):
@@ -681,58 +1141,35 @@ with tab2:
     if fci_proyeccion_ap:
         # A. ESTIMACIÓN DE LA TASA
         # Se calcula la TNA basándose en los últimos 30 días del fondo seleccionado (osea misma logica que proyeccion simple)
-        try:
-            fecha_limite_ap = df.index.max() - pd.Timedelta(days=30)
-            df_reciente_ap = df[df.index >= fecha_limite_ap]
-            valores_fci_ap = df_reciente_ap[fci_proyeccion_ap].dropna()
-            
-            if len(valores_fci_ap) > 1:
-                rendimiento_diario_ap = (valores_fci_ap.iloc[-1] / valores_fci_ap.iloc[0]) ** (1/len(valores_fci_ap)) - 1
-                tna_estimada_ap = rendimiento_diario_ap * 365 * 100
-            else:
-                tna_estimada_ap = 35.0
-            
-            # Limitar tasa entre 20% y 60% para realismo
-            tna_estimada_ap = max(20, min(tna_estimada_ap, 60))
-            
-        except:
-            tna_estimada_ap = 35.0
+        tna_estimada_ap = tnas_estimadas[fci_proyeccion_ap]
         
         # Mostrar TNA estimada
         st.info(f"📊 **TNA estimada del fondo:** {tna_estimada_ap:.2f}% anual (basada en rendimiento reciente)")
-        
-        #B. BUCLE DE ACUMULACIÓN (Interés Compuesto + Flujo de Fondos)
-        proyeccion_aportes = []
-
-        capital_actual_ap = capital_inicial_ap
 
-        #convertimos TNA anual a tasa mensual efectiva
-        tasa_mensual_ap = tna_estimada_ap / 100 / 12
-
-        #variable para rastrear cuanto dinero salio del bolsillo del usuario
-        total_aportado = capital_inicial_ap
-        
-        for mes in range(meses_proyeccion_ap + 1):
-            # Ganancia = Dinero Total en Cuenta - Dinero que puse de mi bolsillo
-            ganancia_acumulada = capital_actual_ap - total_aportado
-            
-            proyeccion_aportes.append({
-                'Mes': mes,
-                'Capital Total': capital_actual_ap,
-                'Total Aportado': total_aportado,
-                'Ganancia por Interés': ganancia_acumulada
-            })
-            
-            # proyeccion hacia el mes siguiente
-            if mes < meses_proyeccion_ap:
-                # 1. El dinero crece por intereses este mes
-                capital_actual_ap = capital_actual_ap * (1 + tasa_mensual_ap)
-                # 2. Se inyecta el nuevo aporte (Fin de mes)
-                capital_actual_ap += aporte_mensual
-                # 3. Actualizamos el contador de dinero invertido
-                total_aportado += aporte_mensual
+        # Modo Monte Carlo (opcional): además de la TNA fija, rendimientos sorteados del historial del fondo
+        col_mc1_ap, col_mc2_ap = st.columns(2)
+        usar_montecarlo_ap = col_mc1_ap.checkbox(
+            "🎲 Simulación Monte Carlo",
+            key="montecarlo_ap",
+            help="Simula 100.000 escenarios con meses reales del historial del fondo y muestra el rango probable"
+        )
+        ajustar_inflacion_mc_ap = col_mc2_ap.checkbox(
+            "🧠 En pesos de hoy (descontando inflación)",
+            key="montecarlo_inflacion_ap",
+            disabled=not usar_montecarlo_ap
+        )
+        bandas_mc_ap = None
+        if usar_montecarlo_ap:
+            try:
+                bandas_mc_ap = obtener_bandas_montecarlo(fci_proyeccion_ap, capital_inicial_ap, aporte_mensual, meses_proyeccion_ap, ajustar_inflacion_mc_ap, version_datos)
+            except (KeyError, ValueError) as e:
+                st.warning(f"No se pudo simular con el historial del fondo: {e}")
         
-        df_proyeccion_ap = pd.DataFrame(proyeccion_aportes)
+        #B. ACUMULACIÓN (Interés Compuesto + Flujo de Fondos)
+        # Cada mes el dinero crece por intereses y al final del mes entra el aporte:
+        # Capital * (1+i)^mes + Aporte * ((1+i)^mes - 1) / i, para todos los meses a la vez
+        df_proyeccion_ap = proyecciones.tabla_proyeccion(capital_inicial_ap, aporte_mensual, tna_estimada_ap, meses_proyeccion_ap)
+        df_proyeccion_ap = df_proyeccion_ap.rename(columns={'Capital': 'Capital Total'})
         
         # ----------------------- 3. RESULTADOS Y KPIs -----------------------
         capital_final_ap = df_proyeccion_ap['Capital Total'].iloc[-1]
@@ -777,7 +1214,7 @@ with tab2:
         st.markdown("### 📊 Comparacion: Invertir vs Solo Guardar")
         
         # Escenario: ¿Qué pasa si guardo la plata bajo el colchón? (Sin interés)
-        solo_aportes = [capital_inicial_ap + (aporte_mensual * mes) for mes in range(meses_proyeccion_ap + 1)]
+        solo_aportes = df_proyeccion_ap['Total Aportado'].to_numpy()
         
         fig_aportes = go.Figure()
         
@@ -811,6 +1248,10 @@ with tab2:
             fill='tozeroy',
             fillcolor='rgba(255, 215, 0, 0.2)'
         ))
+
+        # Línea D (Monte Carlo): rango P5-P95 y mediana de los escenarios simulados
+        if bandas_mc_ap is not None:
+            agregar_bandas_montecarlo(fig_aportes, bandas_mc_ap, ajustar_inflacion_mc_ap)
         
         fig_aportes.update_layout(
             title=f"Evolución con aportes de ${aporte_mensual:,.0f} mensuales en {fci_proyeccion_ap}",
@@ -828,6 +1269,13 @@ with tab2:
         )
         
         st.plotly_chart(fig_aportes, use_container_width=True)
+
+        if bandas_mc_ap is not None:
+            final_mc = bandas_mc_ap.iloc[-1]
+            st.caption(
+                f"🎲 Capital final según el historial{' (pesos de hoy)' if ajustar_inflacion_mc_ap else ''}: "
+                f"P5 ${final_mc['P5']:,.0f} · Mediana ${final_mc['P50']:,.0f} · P95 ${final_mc['P95']:,.0f}"
+            )
         
         # Destacar el beneficio
         st.success(f"🎉 **¡Ganaste ${ganancia_interes:,.0f} extra por invertir en lugar de solo guardar el dinero!**")
@@ -889,52 +1337,25 @@ with tab3:
         st.markdown("---")
         st.markdown(f"### 🏆 Resultados para ${capital_comparador:,.0f} en {meses_comparador} meses")
         
-        # Lista para almacenar los resultados de cada iteración
-        resultados_comparacion = []
-        
-        # BUCLE PRINCIPAL: Iteramos por CADA fondo disponible
-        for fci in fcis_para_comparar:
-            try:
-                # A. CALCULAR TNA INDIVIDUAL
-                # Usamos la misma lógica de "últimos 30 días" para ser justos con todos
-                fecha_limite_comp = df.index.max() - pd.Timedelta(days=30)
-                df_reciente_comp = df[df.index >= fecha_limite_comp]
-                valores_fci_comp = df_reciente_comp[fci].dropna()
-                
-                if len(valores_fci_comp) > 1:
-                    # Rendimiento geometrico diario
-                    rendimiento_diario_comp = (valores_fci_comp.iloc[-1] / valores_fci_comp.iloc[0]) ** (1/len(valores_fci_comp)) - 1
-                    tna_fci = rendimiento_diario_comp * 365 * 100
-                else:
-                    tna_fci = 35.0 # --->Fallback seguro
-                
-                #Normalizacion de tasas
-                tna_fci = max(20, min(tna_fci, 60))
-                
-                # B. PROYECCIÓN INDIVIDUAL
-                tasa_mensual_comp = tna_fci / 100 / 12
-
-                # Fórmula directa de interés compuesto para el plazo total (sin aportes intermedios)
-                capital_final_comp = capital_comparador * ((1 + tasa_mensual_comp) ** meses_comparador)
-                ganancia_comp = capital_final_comp - capital_comparador
-                rentabilidad_comp = (ganancia_comp / capital_comparador) * 100
-                
-                #guardamos la "Ficha Técnica" de este fondo en la lista
-                resultados_comparacion.append({
-                    'FCI': fci,
-                    'TNA': tna_fci,
-                    'Capital Final': capital_final_comp,
-                    'Ganancia': ganancia_comp,
-                    'Rentabilidad %': rentabilidad_comp
-                })
-                
-            except Exception as e:
-                # Si un fondo falla, lo saltamos y seguimos con el siguiente
-                continue
+        # A. TNA DE CADA FONDO
+        # Usamos la misma lógica de "últimos 30 días" para ser justos con todos (una fila de la tabla por fondo)
+        tnas_comparacion = tnas_estimadas[fcis_para_comparar]
+        
+        # B. PROYECCIÓN DE TODOS LOS FONDOS A LA VEZ
+        # Fórmula directa de interés compuesto para el plazo total (sin aportes intermedios)
+        capitales_finales = proyecciones.valor_futuro(capital_comparador, 0, meses_comparador, tnas_comparacion.to_numpy())
+        df_resultados = pd.DataFrame({
+            'FCI': fcis_para_comparar,
+            'TNA': tnas_comparacion.to_numpy(),
+            'Capital Final': capitales_finales,
+            'Ganancia': capitales_finales - capital_comparador,
+            'Rentabilidad %': (capitales_finales - capital_comparador) / capital_comparador * 100,
+        })
         
         # ----------------------- 3. ORDENAMIENTO Y RANKING -----------------------
-        # Ordenamos la lista de diccionarios: El que tenga mayor 'Capital Final' va primero
-        resultados_comparacion = sorted(resultados_comparacion, key=lambda x: x['Capital Final'], reverse=True)
+        # El que tenga mayor 'Capital Final' va primero (en empate se respeta el orden de los fondos)
+        df_resultados = df_resultados.sort_values('Capital Final', ascending=False, kind='stable')
+        resultados_comparacion = df_resultados.to_dict('records')
         
         if len(resultados_comparacion) > 0:
             # Crear DataFrame para visualización
@@ -1076,6 +1497,31 @@ with tab3:
                 
                 st.dataframe(df_comparacion_display, use_container_width=True, hide_index=True)
             
+            # ----------------------- 7. GRILLA FONDOS x PLAZOS -----------------------
+            with st.expander("📅 Ver capital final de cada fondo a distintos plazos"):
+                # Todos los escenarios (fondo x plazo) en una sola operación
+                plazos_grilla = sorted({3, 6, 12, 24, 36, meses_comparador})
+                df_grilla = proyecciones.grilla_valor_futuro(capital_comparador, 0, tnas_comparacion, plazos_grilla)
+                df_grilla = df_grilla.loc[df_comparacion['FCI']]
+                df_grilla.columns = [f"{plazo} meses" for plazo in plazos_grilla]
+                st.dataframe(df_grilla.apply(lambda col: col.map(lambda x: f"${x:,.0f}")), use_container_width=True)
+            
+            # ----------------------- 8. ESTADÍSTICAS DE CADA FONDO -----------------------
+            with st.expander("📐 Ver estadísticas de cada fondo (TNA por período y volatilidad)"):
+                df_estadisticas_display = estadisticas_fondos.reindex(df_comparacion['FCI'])
+                df_estadisticas_display = df_estadisticas_display.rename(columns={
+                    'tna_7d': 'TNA 7 días',
+                    'tna_30d': 'TNA 30 días',
+                    'tna_90d': 'TNA 90 días',
+                    'volatilidad': 'Volatilidad anual',
+                    'ultimo_vcp': 'Último VCP',
+                })
+                for col in ['TNA 7 días', 'TNA 30 días', 'TNA 90 días', 'Volatilidad anual']:
+                    df_estadisticas_display[col] = df_estadisticas_display[col].map(lambda x: f"{x:.2f}%" if pd.notna(x) else "-")
+                df_estadisticas_display['Último VCP'] = df_estadisticas_display['Último VCP'].map(lambda x: f"${x:,.4f}" if pd.notna(x) else "-")
+                st.dataframe(df_estadisticas_display, use_container_width=True)
+                st.caption("TNA sin límites, calculada con el VCP de cada período. Las proyecciones usan la de 30 días, limitada entre 20% y 60%.")
+            
             # Observacion final
             st.success(f"💡 Observacion: Según los datos actuales, **{mejor_fondo['FCI']}** es la mejor opción con una ganancia proyectada de **${mejor_fondo['Ganancia']:,.0f}** en {meses_comparador} meses.")
             
@@ -1148,47 +1594,18 @@ with tab4:
         
     elif fci_objetivo:
         # A. ESTIMACIÓN DE TASA (Igual a pestañas anteriores)
-        try:
-            fecha_limite_obj = df.index.max() - pd.Timedelta(days=30)
-            df_reciente_obj = df[df.index >= fecha_limite_obj]
-            valores_fci_obj = df_reciente_obj[fci_objetivo].dropna()
-            
-            if len(valores_fci_obj) > 1:
-                rendimiento_diario_obj = (valores_fci_obj.iloc[-1] / valores_fci_obj.iloc[0]) ** (1/len(valores_fci_obj)) - 1
-                tna_objetivo = rendimiento_diario_obj * 365 * 100
-            else:
-                tna_objetivo = 35.0
-            
-            tna_objetivo = max(20, min(tna_objetivo, 60))
-            
-        except:
-            tna_objetivo = 35.0
+        tna_objetivo = tnas_estimadas[fci_objetivo]
         
         st.info(f"📊 **TNA estimada del fondo:** {tna_objetivo:.2f}% anual")
         
         # B. CÁLCULO DEL APORTE NECESARIO (PMT)
         # Objetivo: Despejar 'Aporte Mensual' de la fórmula de valor futuro.
-        
-        tasa_mensual_obj = tna_objetivo / 100 / 12
-        
-        # Paso 1: Calcular cuánto valdrá mi dinero actual si no hago nada más.
-        # Fórmula: Capital * (1 + i)^n
-        valor_futuro_capital_inicial = capital_inicial_obj * ((1 + tasa_mensual_obj) ** meses_objetivo)
-        
-        if tasa_mensual_obj > 0:
-            # Paso 2: Calcular cuánto dinero me falta para llegar a la meta
-            diferencia_a_cubrir = objetivo_final - valor_futuro_capital_inicial
-            
-            # Paso 3: Calcular el "Factor de Capitalización de una Serie"
-            # Esto nos dice en cuánto se convierte $1 depositado mensualmente.
-            # Fórmula: ((1+i)^n - 1) / i
-            factor_anualidad = ((1 + tasa_mensual_obj) ** meses_objetivo - 1) / tasa_mensual_obj
-            
-            # Paso 4: División final para obtener la cuota mensual
-            aporte_necesario = diferencia_a_cubrir / factor_anualidad if factor_anualidad != 0 else 0
-        else:
-            # Si la tasa es 0%, es una división simple
-            aporte_necesario = (objetivo_final - capital_inicial_obj) / meses_objetivo
+        #   1. Lo que valdrá el capital actual sin hacer nada más: Capital * (1 + i)^n
+        #   2. Lo que falta para llegar a la meta: Meta - (1)
+        #   3. "Factor de Capitalización de una Serie" (en cuánto se convierte $1 depositado
+        #      mensualmente): ((1+i)^n - 1) / i  --> con tasa 0% es simplemente n
+        #   4. Cuota mensual: (2) / (3)
+        aporte_necesario = float(proyecciones.aporte_necesario(capital_inicial_obj, objetivo_final, meses_objetivo, tna_objetivo))
         
         # ----------------------- 3. VALIDACIÓN DE RESULTADOS -----------------------
         
@@ -1226,22 +1643,14 @@ with tab4:
             st.markdown("---")
             st.markdown("### 📊 Proyección hacia tu Objetivo")
             
-            simulacion_objetivo = []
-            capital_simulado = capital_inicial_obj
-            
-            for mes in range(meses_objetivo + 1):
-                simulacion_objetivo.append({
-                    'Mes': mes,
-                    'Capital Acumulado': capital_simulado,
-                    # Calculamos cuánto falta, sin bajar de 0
-                    'Falta para Meta': max(0, objetivo_final - capital_simulado)
-                })
-                
-                if mes < meses_objetivo:
-                    capital_simulado = capital_simulado * (1 + tasa_mensual_obj) # Crece el dinero
-                    capital_simulado += aporte_necesario                        # Entra el aporte
-            
-            df_simulacion_obj = pd.DataFrame(simulacion_objetivo)
+            # Capital mes a mes con el aporte calculado (crece el dinero y entra el aporte)
+            capital_simulado = proyecciones.trayectorias(capital_inicial_obj, aporte_necesario, tna_objetivo, meses_objetivo)
+            df_simulacion_obj = pd.DataFrame({
+                'Mes': np.arange(meses_objetivo + 1),
+                'Capital Acumulado': capital_simulado,
+                # Calculamos cuánto falta, sin bajar de 0
+                'Falta para Meta': np.maximum(0, objetivo_final - capital_simulado),
+            })
             
             # GRÁFICO 1: LÍNEA DE PROGRESO
             fig_objetivo = go.Figure()
@@ -1326,23 +1735,13 @@ with tab4:
             
             # Generamos 3 escenarios: Menos tiempo, Tiempo actual, Más tiempo
             plazos_alternativos = [max(6, meses_objetivo-12), meses_objetivo, min(60, meses_objetivo+12)]
-            escenarios_plazo = []
-            
-            for plazo_alt in plazos_alternativos:
-                if plazo_alt > 0:
-                    # Recalculamos PMT para cada plazo alternativo
-                    vf_cap_alt = capital_inicial_obj * ((1 + tasa_mensual_obj) ** plazo_alt)
-                    num_alt = objetivo_final - vf_cap_alt
-                    den_alt = ((1 + tasa_mensual_obj) ** plazo_alt - 1) / tasa_mensual_obj if tasa_mensual_obj > 0 else plazo_alt
-                    aporte_alt = num_alt / den_alt if den_alt != 0 else 0
-                    
-                    escenarios_plazo.append({
-                        'Plazo': f"{plazo_alt} meses",
-                        'Aporte Mensual': aporte_alt,
-                        'Total a Aportar': aporte_alt * plazo_alt
-                    })
-            
-            df_escenarios = pd.DataFrame(escenarios_plazo)
+            # Recalculamos el PMT para los 3 plazos en una sola operación
+            aportes_alt = proyecciones.aporte_necesario(capital_inicial_obj, objetivo_final, np.array(plazos_alternativos), tna_objetivo)
+            df_escenarios = pd.DataFrame({
+                'Plazo': [f"{plazo_alt} meses" for plazo_alt in plazos_alternativos],
+                'Aporte Mensual': aportes_alt,
+                'Total a Aportar': aportes_alt * np.array(plazos_alternativos),
+            })
             
             fig_escenarios = go.Figure()
             
@@ -1370,10 +1769,82 @@ with tab4:
             st.plotly_chart(fig_escenarios, use_container_width=True)
             
             # Insight automático: Muestra cuánto ahorras mensualmente si esperas más tiempo
-            ahorro_mensual = aporte_necesario - escenarios_plazo[2]['Aporte Mensual']
+            ahorro_mensual = aporte_necesario - df_escenarios['Aporte Mensual'].iloc[2]
             st.info(f"💡 **Tip:** Si extiendes el plazo a {plazos_alternativos[2]} meses, tu cuota baja en **${ahorro_mensual:,.0f}/mes**.")
             
-            # E. TABLA DETALLADA
+            # E. SENSIBILIDAD COMPLETA (PLAZO x TASA)
+            st.markdown("---")
+            st.markdown("### 🌡️ Aporte necesario según plazo y tasa")
+            
+            # Todos los plazos de 1 a 60 meses contra TNAs de 20% a 60% (más la del fondo) en una sola operación
+            plazos_grilla_obj = np.arange(1, 61)
+            tnas_grilla_obj = np.unique(np.append(
+                np.arange(analitica.TNA_MINIMA, analitica.TNA_MAXIMA + 5, 5),
+                round(tna_objetivo, 2)
+            ))
+            df_sensibilidad = proyecciones.grilla_aporte_necesario(capital_inicial_obj, objetivo_final, plazos_grilla_obj, tnas_grilla_obj)
+            
+            fig_sensibilidad = go.Figure(data=go.Heatmap(
+                z=df_sensibilidad.to_numpy(),
+                x=df_sensibilidad.columns,
+                # Misma precisión que la grilla: dos TNAs distintas nunca comparten etiqueta (Plotly uniría las filas)
+                y=[f"TNA {tna:.2f}%" + (" (fondo)" if tna == round(tna_objetivo, 2) else "") for tna in df_sensibilidad.index],
+                colorscale='Viridis',
+                reversescale=True, # ---> Cuotas bajas en amarillo, altas en violeta
+                zmax=df_sensibilidad[df_sensibilidad.columns[df_sensibilidad.columns >= 6]].to_numpy().max(), # Sin los plazos muy cortos que aplastan la escala
+                colorbar=dict(title="Aporte ($/mes)"),
+                hovertemplate='Plazo: %{x} meses<br>%{y}<br>Aporte: $%{z:,.0f}/mes<extra></extra>'
+            ))
+            
+            # Marca del plazo elegido
+            fig_sensibilidad.add_vline(x=meses_objetivo, line_dash="dash", line_color="white")
+            
+            fig_sensibilidad.update_layout(
+                title=f"Aporte mensual para llegar a ${objetivo_final:,.0f}",
+                xaxis_title="Plazo (meses)",
+                yaxis_title="TNA",
+                template='plotly_dark',
+                height=450
+            )
+            
+            st.plotly_chart(fig_sensibilidad, use_container_width=True)
+            
+            # F. CÁLCULO INVERSO: ¿CUÁNTO TARDO CON LO QUE PUEDO APORTAR?
+            st.markdown("### ⏱️ ¿Y si aporto un monto fijo?")
+            
+            aporte_disponible = st.number_input(
+                "💵 ¿Cuánto puedes aportar por mes? ($)",
+                value=10000,
+                step=1000,
+                min_value=0,
+                key="aporte_disponible_objetivo",
+                help="Calcula en cuántos meses llegarías a la meta con cada fondo"
+            )
+            
+            # Meses necesarios para todos los fondos a la vez: n = ln((A + i*Meta) / (A + i*C)) / ln(1 + i)
+            meses_por_fondo = proyecciones.meses_necesarios(capital_inicial_obj, objetivo_final, aporte_disponible, tnas_estimadas.to_numpy())
+            df_meses_fondos = pd.DataFrame({
+                'FCI': tnas_estimadas.index,
+                'TNA': tnas_estimadas.to_numpy(),
+                'Meses necesarios': np.ceil(meses_por_fondo),
+            }).sort_values('Meses necesarios', kind='stable')
+            
+            mejor_plazo = df_meses_fondos.iloc[0]
+            if np.isfinite(mejor_plazo['Meses necesarios']):
+                st.info(
+                    f"⏱️ Aportando **${aporte_disponible:,.0f}/mes**, con **{mejor_plazo['FCI']}** llegarías a la meta "
+                    f"en **{mejor_plazo['Meses necesarios']:.0f} meses** ({mejor_plazo['Meses necesarios'] / 12:.1f} años)."
+                )
+            else:
+                st.warning("Sin aportes ni intereses la meta no se alcanza nunca.")
+            
+            df_meses_display = df_meses_fondos.copy()
+            df_meses_display['TNA'] = df_meses_display['TNA'].apply(lambda x: f"{x:.2f}%")
+            df_meses_display['Años'] = df_meses_display['Meses necesarios'].apply(lambda x: f"{x / 12:.1f}" if np.isfinite(x) else "-")
+            df_meses_display['Meses necesarios'] = df_meses_display['Meses necesarios'].apply(lambda x: f"{x:.0f}" if np.isfinite(x) else "Nunca")
+            st.dataframe(df_meses_display, use_container_width=True, hide_index=True)
+            
+            # G. TABLA DETALLADA
             with st.expander("📋 Ver evolución mes a mes"):
                 df_simulacion_display = df_simulacion_obj.copy()
                 df_simulacion_display['Capital Acumulado'] = df_simulacion_display['Capital Acumulado'].apply(lambda x: f"${x:,.0f}")
@@ -1433,17 +1904,10 @@ with st.expander("📈 Ver Análisis Histórico ", expanded=False):
         st.subheader("Ganancia/Pérdida Real (Ajustado por Inflación)")
         
         #1. CALCULO DEL TASA REAL
-        # Queremos saber cuanto ganamos *por encima* de la inflacion.
-        # Copiamos el DF para no alterar el original.
-        df_real = df_norm.copy()
-
-        #Iteramos por cada columna y le restamos la curva de inflación.
+        # Queremos saber cuanto ganamos *por encima* de la inflacion: a cada columna
+        # se le resta la curva de inflación (todas a la vez).
         # Si el resultado es positivo, ganamos poder de compra. Si es negativo, perdimos.
-        for c in df_real.columns:
-            df_real[c] = df_real[c] - df_norm['Inflación']
-        
-        # Eliminamos la columna 'Inflación' porque sería una línea plana en 0 (Inflación - Inflación = 0)
-        df_real = df_real.drop(columns=['Inflación'])
+        df_real = analitica.rendimiento_real(df_norm)
 
         # Filtramos solo los instrumentos activos para el gráfico
         df_real = df_real[instrumentos]
@@ -1476,24 +1940,7 @@ with st.expander("💵 Cotizaciones del  Dólar Hoy ", expanded=False):
 
     # ----------------------- 1. CONSULTA SQL INTELIGENTE -----------------------
     try:
-        #Nota sobre la Query:
-        # usamos una sentencia CASE en el ORDER BY.
-        # Esto ordena por "Relevancia".
-        # Queremos que el Oficial, Blue y MEP salgan siempre primero, sin importar su nombre.
-        query_cotizaciones = """
-        SELECT tipo, compra, venta, promedio, fecha
-        FROM cotizaciones_dolar
-        ORDER BY 
-            CASE tipo
-                WHEN 'Oficial' THEN 1
-                WHEN 'Blue' THEN 2
-                WHEN 'MEP' THEN 3
-                WHEN 'CCL' THEN 4
-                WHEN 'Cripto' THEN 5
-                ELSE 6
-            END
-        """
-        df_cotizaciones = conn.query(query_cotizaciones, ttl="10m")
+        df_cotizaciones = obtener_cotizaciones_hoy(version=obtener_version_datos())
     
         # ----------------------- 2. VISUALIZACION DE TARJETAS (METRICS) -----------------------
         #Filtramos solo los dolares mas relevantes para las tarjetas principales
@@ -0,0 +1,231 @@
+import numpy as np
+import pandas as pd
+
+# MOTOR DE PROYECCIONES (fórmulas cerradas sobre arrays de NumPy)
+#
+# Todos los parámetros aceptan escalares o arrays y se combinan por broadcasting:
+# un solo llamado evalúa muchos escenarios (capital, aporte, meses, TNA) sin
+# recorrer mes por mes. Convención de las pestañas: el interés se capitaliza
+# mensualmente (TNA / 12) y el aporte entra al final de cada mes.
+
+
+def tasa_mensual(tna):
+    """TNA % anual -> tasa mensual efectiva (TNA / 100 / 12)"""
+    return np.asarray(tna, dtype='float64') / 100 / 12
+
+
+def factor_capitalizacion(tasa, meses):
+    """(1 + i) ^ n"""
+    return (1 + tasa) ** meses
+
+
+def factor_anualidad(tasa, meses):
+    """
+    Valor futuro de $1 aportado al final de cada mes: ((1 + i)^n - 1) / i.
+
+    Con tasa 0 vale n (suma simple de los aportes).
+    """
+    tasa = np.asarray(tasa, dtype='float64')
+    meses = np.asarray(meses, dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factor = (factor_capitalizacion(tasa, meses) - 1) / tasa
+    return np.where(tasa == 0, meses, factor)
+
+
+def valor_futuro(capital, aporte, meses, tna):
+    """
+    Capital al cabo de `meses` meses: C * (1+i)^n + A * ((1+i)^n - 1) / i.
+
+    Returns:
+        np.ndarray: Un valor por escenario (forma del broadcasting de los parámetros).
+    """
+    tasa = tasa_mensual(tna)
+    return capital * factor_capitalizacion(tasa, meses) + aporte * factor_anualidad(tasa, meses)
+
+
+def trayectorias(capital, aporte, tna, meses):
+    """
+    Capital mes a mes (del mes 0 al mes `meses`) de cada escenario.
+
+    Args:
+        capital, aporte, tna: Escalares o arrays con la misma forma (o broadcastables).
+        meses (int): Horizonte común de todas las trayectorias.
+
+    Returns:
+        np.ndarray: Forma (*escenarios, meses + 1).
+    """
+    mes = np.arange(meses + 1)
+    capital = np.asarray(capital, dtype='float64')[..., None]
+    aporte = np.asarray(aporte, dtype='float64')[..., None]
+    tna = np.asarray(tna, dtype='float64')[..., None]
+    return valor_futuro(capital, aporte, mes, tna)
+
+
+def aporte_necesario(capital, objetivo, meses, tna):
+    """
+    Aporte mensual (PMT) para llegar a `objetivo` en `meses` meses.
+
+    PMT = (Objetivo - C * (1+i)^n) / (((1+i)^n - 1) / i). Negativo si el capital
+    inicial solo ya supera la meta.
+    """
+    tasa = tasa_mensual(tna)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (objetivo - capital * factor_capitalizacion(tasa, meses)) / factor_anualidad(tasa, meses)
+
+
+def meses_necesarios(capital, objetivo, aporte, tna):
+    """
+    Meses para llegar a `objetivo` aportando `aporte` por mes (inversa del valor futuro).
+
+    n = ln((A + i * Objetivo) / (A + i * C)) / ln(1 + i). Con tasa 0: (Objetivo - C) / A.
+
+    Returns:
+        np.ndarray: Meses (con decimales); 0 si el capital ya alcanza la meta e
+        inf si la meta no se alcanza nunca (sin capital, aporte ni tasa).
+    """
+    tasa = tasa_mensual(tna)
+    capital = np.asarray(capital, dtype='float64')
+    objetivo = np.asarray(objetivo, dtype='float64')
+    aporte = np.asarray(aporte, dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        con_tasa = np.log((aporte + tasa * objetivo) / (aporte + tasa * capital)) / np.log1p(tasa)
+        sin_tasa = (objetivo - capital) / aporte
+    meses = np.where(tasa == 0, sin_tasa, con_tasa)
+    meses = np.where(np.isnan(meses), np.inf, meses)
+    return np.where(capital >= objetivo, 0.0, meses)
+
+
+# ==================== TABLAS PARA LAS PESTAÑAS ====================
+
+def tabla_proyeccion(capital, aporte, tna, meses):
+    """
+    Evolución mes a mes de un escenario.
+
+    Returns:
+        pd.DataFrame: Columnas ['Mes', 'Capital', 'Total Aportado', 'Ganancia por Interés'].
+    """
+    mes = np.arange(meses + 1)
+    capital_mes = trayectorias(capital, aporte, tna, meses)
+    total_aportado = capital + aporte * mes
+    return pd.DataFrame({
+        'Mes': mes,
+        'Capital': capital_mes,
+        'Total Aportado': total_aportado,
+        'Ganancia por Interés': capital_mes - total_aportado,
+    })
+
+
+def grilla_valor_futuro(capital, aporte, tnas, plazos):
+    """
+    Capital final para cada combinación de fondo y plazo.
+
+    Args:
+        tnas (pd.Series): TNA % por fondo (índice = nombre del fondo).
+        plazos (list): Plazos en meses.
+
+    Returns:
+        pd.DataFrame: Una fila por fondo y una columna por plazo.
+    """
+    valores = valor_futuro(capital, aporte, np.asarray(plazos)[None, :], tnas.to_numpy()[:, None])
+    return pd.DataFrame(valores, index=tnas.index, columns=list(plazos))
+
+
+def grilla_aporte_necesario(capital, objetivo, plazos, tnas):
+    """
+    Aporte mensual necesario para cada combinación de TNA y plazo (sensibilidad de la meta).
+
+    Args:
+        plazos (array): Plazos en meses (columnas).
+        tnas (array): TNA % anual (filas).
+
+    Returns:
+        pd.DataFrame: Una fila por TNA y una columna por plazo; 0 donde el capital
+        inicial solo ya alcanza la meta.
+    """
+    plazos = np.asarray(plazos)
+    tnas = np.asarray(tnas, dtype='float64')
+    aportes = aporte_necesario(capital, objetivo, plazos[None, :], tnas[:, None])
+    return pd.DataFrame(np.maximum(aportes, 0), index=tnas, columns=plazos)
+
+
+# ==================== SIMULACIÓN MONTE CARLO ====================
+# En vez de una TNA fija, los rendimientos futuros se sortean del historial del
+# fondo (bootstrap). Se sortean meses enteros: bloques de DIAS_POR_MES días
+# consecutivos del historial (moving-block bootstrap). Cada mes simulado conserva
+# sus fines de semana y la correlación entre días, y alcanza con un sorteo por mes
+# en vez de uno por día.
+
+DIAS_POR_MES = 30
+CAMINOS_MONTECARLO = 100_000
+SEMILLA_MONTECARLO = 42
+PERCENTILES_MONTECARLO = (5, 50, 95)
+
+# Meses sorteados por bloque de caminos: acota la memoria de los arrays intermedios
+MESES_POR_BLOQUE = 1_000_000
+
+
+def rendimientos_diarios(serie, indice_inflacion=None):
+    """
+    Log-rendimientos diarios de una serie con calendario diario (ej: VCP rellenado).
+
+    Args:
+        serie (pd.Series): Valores diarios (índice fecha).
+        indice_inflacion (pd.Series): Índice diario de inflación. Si se pasa, los
+            rendimientos son reales (a cada día se le resta la inflación del día).
+
+    Returns:
+        np.ndarray: Un rendimiento por día, sin NaN.
+    """
+    log_rendimientos = np.log(serie.astype('float64')).diff()
+    if indice_inflacion is not None:
+        log_rendimientos = log_rendimientos - np.log(indice_inflacion.astype('float64')).diff()
+    return log_rendimientos.dropna().to_numpy()
+
+
+def rendimientos_mensuales(rendimientos, dias=DIAS_POR_MES):
+    """Log-rendimiento de cada ventana de `dias` días consecutivos (una por día de inicio)"""
+    acumulado = np.concatenate(([0.0], np.cumsum(rendimientos)))
+    return acumulado[dias:] - acumulado[:-dias]
+
+
+def simular_montecarlo(rendimientos, capital, aporte, meses, caminos=CAMINOS_MONTECARLO,
+                       semilla=SEMILLA_MONTECARLO, percentiles=PERCENTILES_MONTECARLO):
+    """
+    Bandas de capital mes a mes con rendimientos sorteados del historial.
+
+    Con la misma semilla el resultado es siempre el mismo: las bandas no cambian
+    entre recargas de la página.
+
+    Args:
+        rendimientos (np.ndarray): Log-rendimientos diarios (ver rendimientos_diarios).
+        capital, aporte (float): Capital inicial y aporte al final de cada mes.
+        meses (int): Horizonte de la simulación.
+        caminos (int): Escenarios simulados.
+        semilla (int): Semilla del generador aleatorio.
+        percentiles (tuple): Percentiles a devolver.
+
+    Returns:
+        pd.DataFrame: Columna 'Mes' y una columna por percentil ('P5', 'P50', 'P95').
+    """
+    meses_historial = rendimientos_mensuales(rendimientos)
+    if len(meses_historial) == 0:
+        raise ValueError(f"Se necesitan al menos {DIAS_POR_MES + 1} días de historial para simular")
+
+    generador = np.random.default_rng(semilla)
+    valores = np.empty((caminos, meses + 1))
+    valores[:, 0] = capital
+
+    caminos_por_bloque = max(1, MESES_POR_BLOQUE // max(meses, 1))
+    for inicio in range(0, caminos, caminos_por_bloque):
+        fin = min(inicio + caminos_por_bloque, caminos)
+        sorteo = generador.integers(0, len(meses_historial), size=(fin - inicio, meses))
+        # Crecimiento acumulado de cada camino hasta cada mes
+        crecimiento = np.exp(np.cumsum(meses_historial[sorteo], axis=1))
+        # El aporte del mes k crece desde ese mes: V_m = P_m * (C + A * Σ_{k<=m} 1 / P_k)
+        valores[inicio:fin, 1:] = crecimiento * (capital + aporte * np.cumsum(1 / crecimiento, axis=1))
+
+    bandas = np.percentile(valores, percentiles, axis=0)
+    return pd.DataFrame({
+        'Mes': np.arange(meses + 1),
+        **{f'P{p}': banda for p, banda in zip(percentiles, bandas)},
+    })
@@ -3,27 +3,28 @@ import psycopg2
 from datetime import datetime
 import json
 from dotenv import load_dotenv
-import os
+
+from carga_masiva import cargar_masivo, registrar_filas_modificadas
+from conexion_db import transaccion
+from motor_extraccion import obtener_motor
+from almacen_crudo import guardar_crudo
 
 # %%
 
 # Cargar variables de entorno
 load_dotenv()
 
-# --- CONFIGURACIÓN BASE DE DATOS ---
-
-DATABASE_URL = os.getenv("DATABASE_URL_NEON") 
-
 # EXTRAER DATOS
 
 class ExtractorDolar:
     """Extrae cotizaciones del dólar desde APIs públicas"""
     
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        # Motor del proceso: respeta los límites por host compartidos con las demás etapas
+        self.motor = obtener_motor()
+        self.cliente = self.motor.cliente
+        # Última respuesta procesada: su ETag se guarda recién cuando los datos están en la base
+        self.respuesta = None
     
     def obtener_cotizaciones(self) -> dict:
         """
@@ -36,15 +37,25 @@ class ExtractorDolar:
                 'Blue': {'compra': 1400, 'venta': 1450, 'fecha': '2025-11-28T...'},
                 ...
             }
+            None si la API respondió 304 (sin cambios desde la última carga)
         """
+        # Solo se pide condicional si la tabla tiene datos: el cache de ETag es
+        # independiente de la base y un 304 con la tabla vacía la dejaría sin cargar
+        with transaccion() as cur:
+            cur.execute("SELECT EXISTS (SELECT 1 FROM cotizaciones_dolar)")
+            hay_datos = cur.fetchone()[0]
+
         try:
             print("🔄 Consultando API de DolarAPI.com...")
             
             url = "https://dolarapi.com/v1/dolares"
-            response = self.session.get(url, timeout=10)
+            response = self.motor.obtener(url, condicional=hay_datos)
+            if self.cliente.sin_cambios(response):
+                return None
             response.raise_for_status()
             
             datos_api = response.json()
+            guardar_crudo("dolar_ahora", datetime.now().date(), "dolares", response.content)
             
             # Procesar y estructurar los datos
             cotizaciones = {}
@@ -57,6 +68,7 @@ class ExtractorDolar:
                 }
             
             print(f"✅ Cotizaciones obtenidas: {len(cotizaciones)} tipos de dólar")
+            self.respuesta = response
             return cotizaciones
             
         except requests.exceptions.RequestException as e:
@@ -73,9 +85,6 @@ class ExtractorDolar:
     def crear_tabla_db(self):
         """Crea la tabla en PostgreSQL --> si no existe"""
         try:
-            conn = psycopg2.connect(DATABASE_URL)
-            cur = conn.cursor()
-            
             query = """
             CREATE TABLE IF NOT EXISTS cotizaciones_dolar (
                 id SERIAL PRIMARY KEY,
@@ -91,17 +100,14 @@ class ExtractorDolar:
             CREATE INDEX IF NOT EXISTS idx_dolar_tipo ON cotizaciones_dolar(tipo);
             """
             
-            cur.execute(query)
-            conn.commit()
+            with transaccion() as cur:
+                cur.execute(query)
             
             print("✅ Tabla 'cotizaciones_dolar' verificada en PostgreSQL")
             
         except psycopg2.Error as e:
             print(f"❌ Error al crear tabla: {e}")
-        finally:
-            if 'conn' in locals() and conn:
-                cur.close()
-                conn.close()
+            raise
     
     def guardar_en_db(self, cotizaciones: dict) -> int:
         """
@@ -117,44 +123,38 @@ class ExtractorDolar:
             return 0
         
         try:
-            conn = psycopg2.connect(DATABASE_URL)
-            cur = conn.cursor()
-            
-            # 1. BORRAR DATOS VIEJOS
-            # Usamos TRUNCATE para vaciar la tabla completamente antes de guardar lo nuevo
-            cur.execute("TRUNCATE TABLE cotizaciones_dolar RESTART IDENTITY;")
+            # TRUNCATE + carga en la misma transacción: nunca queda la tabla vacía a la vista
+            with transaccion() as cur:
+                # 1. BORRAR DATOS VIEJOS
+                # Usamos TRUNCATE para vaciar la tabla completamente antes de guardar lo nuevo
+                cur.execute("TRUNCATE TABLE cotizaciones_dolar RESTART IDENTITY;")
 
-            fecha_actual = datetime.now()
-            registros_guardados = 0
-            
-            # 2. INSERTAR DATOS NUEVOS
-            for tipo, valores in cotizaciones.items():
-                compra = valores['compra']
-                venta = valores['venta']
-                promedio = (compra + venta) / 2
+                fecha_actual = datetime.now()
                 
-                # Insert simple (ya no necesitamos ON CONFLICT porque la tabla está vacía)
-                query = """
-                INSERT INTO cotizaciones_dolar (fecha, tipo, compra, venta, promedio)
-                VALUES (%s, %s, %s, %s, %s)
-                """
+                # 2. INSERTAR DATOS NUEVOS (COPY en una sola ida a la base)
+                filas = []
+                for tipo, valores in cotizaciones.items():
+                    compra = valores['compra']
+                    venta = valores['venta']
+                    promedio = (compra + venta) / 2
+                    filas.append((fecha_actual, tipo, compra, venta, promedio))
                 
-                cur.execute(query, (fecha_actual, tipo, compra, venta, promedio))
-                registros_guardados += 1
-            
-            conn.commit()
+                # Insert simple (ya no necesitamos ON CONFLICT porque la tabla está vacía)
+                registros_guardados, _ = cargar_masivo(
+                    cur,
+                    "cotizaciones_dolar",
+                    ["fecha", "tipo", "compra", "venta", "promedio"],
+                    filas,
+                )
+
+            registrar_filas_modificadas("cotizaciones_dolar", registros_guardados)
+            self.cliente.confirmar(self.respuesta)
             
             return registros_guardados
             
         except psycopg2.Error as e:
             print(f"❌ Error de Base de Datos: {e}")
-            if 'conn' in locals():
-                conn.rollback()
-            return 0
-        finally:
-            if 'conn' in locals() and conn:
-                cur.close()
-                conn.close()
+            raise
     
     
 # ==================== FUNCIONES DE UTILIDAD ====================
@@ -168,10 +168,13 @@ def ejecutar_extraccion_completa():
     
     # 2. Obtener cotizaciones
     cotizaciones = extractor.obtener_cotizaciones()
+
+    if cotizaciones is None:
+        print("⏭️  Cotizaciones sin cambios desde la última carga")
+        return
     
     if not cotizaciones:
-        print("\n❌ No se pudieron obtener cotizaciones")
-        return
+        raise RuntimeError("No se pudieron obtener cotizaciones")
     
     # 4. Guardar en base de datos
     print("\n💾 Guardando en PostgreSQL...")
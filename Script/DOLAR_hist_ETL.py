@@ -1,23 +1,68 @@
-import requests
 import psycopg2
-from datetime import datetime
+from datetime import date, timedelta
 from dotenv import load_dotenv
+import argparse
 import os
 
-load_dotenv()
+from motor_extraccion import obtener_motor
+from carga_masiva import cargar_masivo, registrar_filas_modificadas
+from conexion_db import transaccion
+from almacen_crudo import guardar_crudo
 
-# --- CONFIGURACIÓN DE TU BASE DE DATOS ---
-DATABASE_URL = os.getenv("DATABASE_URL_NEON") 
+load_dotenv()
 
 # Tipos de dólar a consultar
 TIPOS_DOLAR = ["oficial", "blue", "bolsa", "contadoconliqui", "mayorista", "cripto", "tarjeta"]
 
+# Ventana de carga inicial (días hacia atrás) para los tipos que todavía no tienen historial
+DIAS_HISTORIAL = int(os.getenv("DOLAR_HIST_DIAS", "365"))
+
+
+def formatear_tipo(tipo: str) -> str:
+    """Nombre del tipo de dólar tal como se guarda en la tabla"""
+    if tipo == "contadoconliqui":
+        return "Contado con liquidación"
+    return tipo.capitalize()
+
+
+def transformar_historial(tipo: str, datos_api: list) -> list:
+    """
+    Convierte la respuesta de la API de un tipo de dólar en filas para la tabla.
+
+    Returns:
+        list: Tuplas (fecha, tipo, compra, venta, promedio)
+    """
+    tipo_formateado = formatear_tipo(tipo)
+    filas = []
+    for fila in datos_api:
+        # Mapeo de datos
+        compra = fila['compra']
+        venta = fila['venta']
+
+        # Calculamos el PROMEDIO
+        promedio = (compra + venta) / 2
+
+        filas.append((fila['fecha'], tipo_formateado, compra, venta, promedio))
+    return filas
+
+
+def obtener_ultimas_fechas(cur) -> dict:
+    """
+    Marca de agua por tipo: última fecha ya guardada.
+
+    Returns:
+        dict: {'Blue': date(2025, 11, 28), ...}
+    """
+    cur.execute("""
+        SELECT tipo, MAX(fecha)
+        FROM cotizaciones_dolar_hist
+        GROUP BY tipo
+    """)
+    return dict(cur.fetchall())
+
 def crear_tabla_historica():
     """Crea la tabla de histórico si no existe"""
     try:
-        conn = psycopg2.connect(DATABASE_URL)
-        cur = conn.cursor()
-        
         query = """
         CREATE TABLE IF NOT EXISTS cotizaciones_dolar_hist (
             id SERIAL PRIMARY KEY,
@@ -33,72 +78,99 @@ def crear_tabla_historica():
         CREATE INDEX IF NOT EXISTS idx_dolar_hist_tipo ON cotizaciones_dolar_hist(tipo);
         """
         
-        cur.execute(query)
-        conn.commit()
+        with transaccion() as cur:
+            cur.execute(query)
         print("✅ Tabla 'cotizaciones_dolar_hist' verificada")
         
     except psycopg2.Error as e:
         print(f"❌ Error al crear tabla histórica: {e}")
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
+        raise
 
-def guardar_historial_db():
+def guardar_historial_db(dias_historial=DIAS_HISTORIAL):
+    """
+    Carga incremental del histórico: solo se guardan las fechas posteriores
+    a la última ya cargada de cada tipo. Si un tipo no tiene historial,
+    se cargan los últimos `dias_historial` días.
+    """
     try:
-        # 1. Conexión a la Base de Datos
-        conn = psycopg2.connect(DATABASE_URL)
-        cur = conn.cursor()
+        # 1. Marcas de agua (lectura corta: la conexión no queda tomada durante la descarga)
+        with transaccion() as cur:
+            ultimas_fechas = obtener_ultimas_fechas(cur)
         print("✅ Conexión a la base de datos exitosa.")
 
-        # 2. Recorremos cada tipo de dólar
+        fecha_inicial = date.today() - timedelta(days=dias_historial)
+
+        # 2. Descargamos todos los tipos de dólar en paralelo
+        # Los tipos que ya tienen historial se piden condicionales (304 = nada nuevo)
+        motor = obtener_motor()
+        urls = {
+            tipo: f"https://api.argentinadatos.com/v1/cotizaciones/dolares/{tipo}"
+            for tipo in TIPOS_DOLAR
+        }
+        respuestas = motor.descargar(
+            urls,
+            condicionales=[tipo for tipo in TIPOS_DOLAR if formatear_tipo(tipo) in ultimas_fechas],
+        )
+
+        filas = []
+        procesadas = []
+
+        # Recorremos cada tipo de dólar
         for tipo in TIPOS_DOLAR:
-            url = f"https://api.argentinadatos.com/v1/cotizaciones/dolares/{tipo}"
-            
-            response = requests.get(url, timeout=10)
+            response = respuestas.get(tipo)
+            if motor.cliente.sin_cambios(response):
+                print(f"⏭️  {tipo}: sin cambios desde la última carga")
+                continue
+            if response is None or not response.ok:
+                print(f"⚠️ Sin datos para {tipo}")
+                continue
+
             datos = response.json()
+            procesadas.append(response)
+            guardar_crudo("dolar_hist", date.today(), tipo, response.content)
+
+            ultima_fecha = ultimas_fechas.get(formatear_tipo(tipo))
 
-            anio_actual = datetime.now().year
+            # 3. Armamos las filas de todos los tipos para una única carga masiva
+            for fila in transformar_historial(tipo, datos):
+                fecha_dato = date.fromisoformat(fila[0][:10])
 
-            # 3. Insertamos registro por registro
-            registros_nuevos = 0
-            for fila in datos:
-                # Mapeo de datos
-                fecha = fila['fecha']
-                if datetime.fromisoformat(fecha).year != anio_actual:
+                # Solo lo que es más nuevo que la marca de agua (o entra en la ventana inicial)
+                if ultima_fecha is not None:
+                    if fecha_dato <= ultima_fecha:
+                        continue
+                elif fecha_dato < fecha_inicial:
                     continue
-                compra = fila['compra']
-                venta = fila['venta']
-                
-                # Calculamos el PROMEDIO
-                promedio = (compra + venta) / 2
-                
-                # Nombre del tipo
-                tipo_formateado = tipo.capitalize() 
-                if tipo == "contadoconliqui": 
-                    tipo_formateado = "Contado con liquidación"
-
-                # SQL de inserción
-                query = """
-                    INSERT INTO cotizaciones_dolar_hist (fecha, tipo, compra, venta, promedio)
-                    VALUES (%s, %s, %s, %s, %s)
-                    ON CONFLICT DO NOTHING; 
-                """
-                
-                cur.execute(query, (fecha, tipo_formateado, compra, venta, promedio))
-                registros_nuevos += 1
-
-        # 4. Guardar cambios
-        conn.commit()
-        print(f"🚀 {registros_nuevos} registros históricos guardados")
+
+                filas.append(fila)
+
+        # 4. COPY + ON CONFLICT DO NOTHING (red de seguridad si dos corridas se pisan)
+        # en una sola transacción
+        with transaccion() as cur:
+            registros_nuevos, _ = cargar_masivo(
+                cur,
+                "cotizaciones_dolar_hist",
+                ["fecha", "tipo", "compra", "venta", "promedio"],
+                filas,
+                claves=["fecha", "tipo"],
+            )
+
+        registrar_filas_modificadas("cotizaciones_dolar_hist", registros_nuevos)
+
+        # Recién con los datos guardados se recuerdan los ETag de cada tipo
+        motor.cliente.confirmar(*procesadas)
+
+        print(f"🚀 {registros_nuevos} registros históricos nuevos ({len(filas)} posteriores a la última fecha cargada)")
 
     except Exception as e:
         print(f"❌ Error: {e}")
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
+        raise
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ETL histórico del dólar (API -> PostgreSQL)")
+    parser.add_argument("--dias", type=int, default=DIAS_HISTORIAL,
+                        help="Días hacia atrás a cargar para los tipos sin historial")
+    args = parser.parse_args()
+
     crear_tabla_historica()
-    guardar_historial_db()
\ No newline at end of file
+    guardar_historial_db(dias_historial=args.dias)
\ No newline at end of file
@@ -1,19 +1,21 @@
 import psycopg2
-import requests
-from psycopg2 import sql
-from datetime import datetime, timedelta
-import time
+from datetime import date, datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
-import os
+import argparse
+
+from motor_extraccion import obtener_motor
+from carga_masiva import cargar_masivo, registrar_filas_modificadas
+from conexion_db import transaccion
+from almacen_crudo import guardar_crudo
 
 
 load_dotenv() # Carga las variables de un archivo .env
 
 # --- CONFIGURACIÓN BASE DE DATOS ---
 
-DATABASE_URL = os.getenv("DATABASE_URL_NEON")
-
 NOMBRE_TABLA = "rendimientos_fci"
+NOMBRE_TABLA_PROGRESO = "fci_backfill_progreso"
 
 # --- CONFIGURACIÓN DE BILLETERAS Y API ---
 DIAS_A_CONSULTAR = 10
@@ -23,16 +25,19 @@ BILLETERAS_OBJETIVO = {
     "Personal Pay": ["delta pesos", "delta ahorro"]
 }
 
+# --- CONFIGURACIÓN DEL BACKFILL HISTÓRICO ---
+DIAS_POR_BLOQUE = 30
+BLOQUES_EN_PARALELO = 4
+
+# Un 404 de los últimos días puede ser un dato que todavía no se publicó:
+# recién pasado este plazo la fecha queda registrada como 'sin_datos' (finde/feriado)
+DIAS_PUBLICACION = 3
+
 # %%
 
 
 def crear_tabla_postgres():
-    conn = None
     try:
-        # Conexión a la base de datos
-        conn = psycopg2.connect(DATABASE_URL)
-        cur = conn.cursor()
-        
         # SQL para crear la tabla
         # SERIAL es el equivalente a AUTOINCREMENT
         # NUMERIC(18, 6) asegura que guardemos los 6 decimales del VCP con precisión exacta
@@ -50,190 +55,465 @@ def crear_tabla_postgres():
         );
         """
         
-        cur.execute(query)
+        with transaccion() as cur:
+            cur.execute(query)
 
-        # Asegurar que exista la columna 'tna' 
-        alter_query = f"ALTER TABLE {NOMBRE_TABLA} ADD COLUMN IF NOT EXISTS tna NUMERIC(10, 4);"
-        cur.execute(alter_query)
+            # Asegurar que exista la columna 'tna' 
+            alter_query = f"ALTER TABLE {NOMBRE_TABLA} ADD COLUMN IF NOT EXISTS tna NUMERIC(10, 4);"
+            cur.execute(alter_query)
 
-        conn.commit()
+            # Índice para la ventana de fechas que consulta el dashboard por billetera
+            index_query = f"CREATE INDEX IF NOT EXISTS idx_fci_billetera_fecha ON {NOMBRE_TABLA} (billetera, fecha);"
+            cur.execute(index_query)
+
+            # Índice parcial con las filas que todavía no tienen TNA (marca de agua del recálculo incremental)
+            index_query = f"CREATE INDEX IF NOT EXISTS idx_fci_tna_pendiente ON {NOMBRE_TABLA} (fondo, fecha) WHERE tna IS NULL;"
+            cur.execute(index_query)
+
+            # Checkpoint del backfill: una fila por fecha ya resuelta (con datos o sin datos)
+            progreso_query = f"""
+            CREATE TABLE IF NOT EXISTS {NOMBRE_TABLA_PROGRESO} (
+                fecha DATE PRIMARY KEY,
+                estado VARCHAR(20) NOT NULL,
+                registros INTEGER NOT NULL DEFAULT 0,
+                procesado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            """
+            cur.execute(progreso_query)
 
         print("✅ Tabla verificada correctamente.")
         
     except psycopg2.Error as e:
         print(f"❌ Error al conectar o crear tabla: {e}")
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
+        raise
+
+def filtrar_billeteras_objetivo(datos_api: list, fecha_str_db: str) -> list:
+    """
+    Se queda con un fondo por billetera de la respuesta diaria de la API.
+
+    Returns:
+        list: Tuplas (billetera, fondo, fecha, vcp, patrimonio, horizonte)
+    """
+    encontrados_dia = []
+    billeteras_procesadas_hoy = set()
+
+    for fondo in datos_api:
+        nombre_fondo = fondo.get('fondo', '').lower()
+
+        for billetera_nombre, patrones in BILLETERAS_OBJETIVO.items():
+            if billetera_nombre not in billeteras_procesadas_hoy:
+                for patron in patrones:
+                    if patron in nombre_fondo:
+
+                        # Preparar datos para insertar
+                        patrimonio = fondo.get('patrimonio')
+                        if not patrimonio or str(patrimonio).lower() == 'null':
+                            patrimonio = None
+
+                        encontrados_dia.append((
+                            billetera_nombre,
+                            fondo.get('fondo'),
+                            fecha_str_db, # Usamos formato DB
+                            float(fondo.get('vcp', 0)),
+                            patrimonio,
+                            fondo.get('horizonte')
+                        ))
+                        billeteras_procesadas_hoy.add(billetera_nombre)
+                        break
+
+    return encontrados_dia
+
+
+def obtener_fechas_completas(cur, desde, hasta) -> set:
+    """
+    Fechas del rango que no hace falta volver a pedir: las que ya tienen guardadas
+    TODAS las billeteras objetivo y las registradas sin datos (fines de semana, feriados).
+
+    Returns:
+        set: {date(2025, 11, 28), ...}
+    """
+    query = f"""
+    SELECT fecha
+    FROM {NOMBRE_TABLA}
+    WHERE fecha BETWEEN %s AND %s
+      AND billetera = ANY(%s)
+    GROUP BY fecha
+    HAVING COUNT(DISTINCT billetera) = %s
+    UNION
+    SELECT fecha
+    FROM {NOMBRE_TABLA_PROGRESO}
+    WHERE fecha BETWEEN %s AND %s
+      AND estado = 'sin_datos'
+    """
+    billeteras = list(BILLETERAS_OBJETIVO)
+    cur.execute(query, (desde, hasta, billeteras, len(billeteras), desde, hasta))
+    return {fila[0] for fila in cur.fetchall()}
+
+
+def obtener_fechas_registradas(cur, desde, hasta) -> set:
+    """Fechas del rango que el backfill ya marcó como resueltas"""
+    query = f"SELECT fecha FROM {NOMBRE_TABLA_PROGRESO} WHERE fecha BETWEEN %s AND %s"
+    cur.execute(query, (desde, hasta))
+    return {fila[0] for fila in cur.fetchall()}
+
+
+def obtener_registros_por_fecha(cur, desde, hasta) -> dict:
+    """
+    Registros ya guardados por fecha (solo las fechas que tienen alguno).
+    Únicamente estas fechas se piden condicionales: el cache de ETag es
+    independiente de la base y un 304 de una fecha sin filas la dejaría sin cargar.
+
+    Returns:
+        dict: {date(2025, 11, 28): 3, ...}
+    """
+    query = f"""
+    SELECT fecha, COUNT(*)
+    FROM {NOMBRE_TABLA}
+    WHERE fecha BETWEEN %s AND %s
+    GROUP BY fecha
+    """
+    cur.execute(query, (desde, hasta))
+    return dict(cur.fetchall())
+
+
+def procesar_api_e_insertar(desde=None, hasta=None, forzar=False,
+                            registrar_progreso=False, motor=None) -> int:
+    """
+    Consulta la API e inserta directamente en PostgreSQL sin pasar por CSV.
+
+    Solo se piden las fechas que todavía no tienen las tres billeteras
+    cargadas. Con `forzar=True` se vuelven a pedir todas las fechas del
+    rango y se pisan los valores existentes.
+
+    Args:
+        desde (date): Primer día a consultar (por defecto hoy - DIAS_A_CONSULTAR + 1).
+        hasta (date): Último día a consultar (por defecto hoy).
+        forzar (bool): Ignora lo ya cargado y vuelve a descargar el rango.
+        registrar_progreso (bool): Guarda en la tabla de progreso todas las fechas
+            resueltas (en la misma transacción que los datos) y omite las
+            que ya estaban registradas. Lo usa el backfill. Sin esta opción
+            solo se registran las fechas sin datos (fines de semana y feriados).
+        motor (MotorExtraccion): Motor a usar. Si es None se usa el del
+            proceso (ver obtener_motor).
+
+    Returns:
+        int: Cantidad de registros nuevos
+    """
+    hasta = hasta or datetime.now().date()
+    desde = desde or hasta - timedelta(days=DIAS_A_CONSULTAR - 1)
+    dias = (hasta - desde).days + 1
 
-def procesar_api_e_insertar():
-    """Consulta la API e inserta directamente en PostgreSQL sin pasar por CSV."""
     print("=" * 60)
-    print(f"📡 INICIANDO ETL DIRECTO API -> POSTGRES ({DIAS_A_CONSULTAR} DÍAS)")
+    print(f"📡 INICIANDO ETL DIRECTO API -> POSTGRES ({dias} DÍAS)")
     print("=" * 60)
 
-    conn = None
     try:
-        conn = psycopg2.connect(DATABASE_URL)
-        cur = conn.cursor()
-        
-        fecha_actual = datetime.now()
-        nuevos_registros = 0
-        
-        for i in range(DIAS_A_CONSULTAR):
-            fecha_obj = fecha_actual - timedelta(days=i)
-            # La API usa formato YYYY/MM/DD
-            fecha_str_api = fecha_obj.strftime("%Y/%m/%d")
+        registros_a_cargar = []
+
+        # Días ya completos en la base (no hace falta volver a pedirlos)
+        fechas_completas = set()
+        registros_por_fecha = {}
+        if not forzar:
+            with transaccion() as cur:
+                fechas_completas = obtener_fechas_completas(cur, desde, hasta)
+                registros_por_fecha = obtener_registros_por_fecha(cur, desde, hasta)
+                if registrar_progreso:
+                    fechas_completas |= obtener_fechas_registradas(cur, desde, hasta)
+
+        # La API usa formato YYYY/MM/DD (del más reciente al más viejo)
+        fechas_api = [
+            (hasta - timedelta(days=i)).strftime("%Y/%m/%d")
+            for i in range(dias)
+            if (hasta - timedelta(days=i)) not in fechas_completas
+        ]
+
+        if fechas_completas:
+            print(f"⏭️  {len(fechas_completas)} días ya cargados, se omiten")
+
+        # Descarga concurrente de los días faltantes (el motor limita peticiones en vuelo y por host)
+        print(f"⏳ Consultando {len(fechas_api)} días en paralelo...")
+        # Fuera del modo forzado, los días que ya tienen filas y no cambiaron vuelven con 304
+        motor = motor or obtener_motor()
+        respuestas = motor.descargar(
+            {
+                fecha_str_api: f"https://api.argentinadatos.com/v1/finanzas/fci/mercadoDinero/{fecha_str_api}"
+                for fecha_str_api in fechas_api
+            },
+            condicionales=[
+                fecha_str_api for fecha_str_api in fechas_api
+                if datetime.strptime(fecha_str_api, "%Y/%m/%d").date() in registros_por_fecha
+            ],
+        )
+
+        # Fechas resueltas para el checkpoint: (fecha, estado, registros)
+        # Los errores de red/HTTP no se registran, así se reintentan en la próxima corrida
+        progreso = []
+        ultima_fecha_definitiva = datetime.now().date() - timedelta(days=DIAS_PUBLICACION)
+        procesadas = []
+
+        for fecha_str_api in fechas_api:
             # Para la DB usamos formato estándar YYYY-MM-DD
-            fecha_str_db = fecha_obj.strftime("%Y-%m-%d")
-            
-            url = f"https://api.argentinadatos.com/v1/finanzas/fci/mercadoDinero/{fecha_str_api}"
-            
-            print(f"⏳ Consultando: {fecha_str_api}...", end=" ")
-            
+            fecha_str_db = fecha_str_api.replace("/", "-")
+
+            response = respuestas.get(fecha_str_api)
+            if response is None:
+                print(f"⏳ {fecha_str_api}: ❌ Error API")
+                continue
+
+            if motor.cliente.sin_cambios(response):
+                print(f"⏳ {fecha_str_api}: ⏭️ Sin cambios desde la última carga")
+                # Solo se pidieron condicionales las fechas con filas: quedan resueltas
+                progreso.append((
+                    fecha_str_db, "cargado", registros_por_fecha[date.fromisoformat(fecha_str_db)]
+                ))
+                continue
+
+            if response.status_code == 404:
+                print(f"⏳ {fecha_str_api}: ❌ Sin datos (Feriado/Finde)")
+                # Un día reciente se vuelve a pedir: puede que todavía no esté publicado
+                if date.fromisoformat(fecha_str_db) <= ultima_fecha_definitiva:
+                    progreso.append((fecha_str_db, "sin_datos", 0))
+                continue
+
+            if not response.ok:
+                print(f"⏳ {fecha_str_api}: ❌ Error API: HTTP {response.status_code}")
+                continue
+
+            # La respuesta completa queda en el almacén crudo (permite reprocesar sin la API)
+            guardar_crudo("fci", fecha_str_db, "mercadoDinero", response.content)
+
+            # Filtrado en memoria (un día con respuesta o VCP mal formados se omite, no corta la corrida)
             try:
-                response = requests.get(url, timeout=10)
-                
-                if response.status_code == 404:
-                    print("❌ Sin datos (Feriado/Finde)")
-                    continue
-                    
-                response.raise_for_status()
-                datos_api = response.json()
-                
-                # Filtrado en memoria
-                encontrados_dia = []
-                billeteras_procesadas_hoy = set()
-                
-                for fondo in datos_api:
-                    nombre_fondo = fondo.get('fondo', '').lower()
-                    
-                    for billetera_nombre, patrones in BILLETERAS_OBJETIVO.items():
-                        if billetera_nombre not in billeteras_procesadas_hoy:
-                            for patron in patrones:
-                                if patron in nombre_fondo:
-                                    
-                                    # Preparar datos para insertar
-                                    patrimonio = fondo.get('patrimonio')
-                                    if not patrimonio or str(patrimonio).lower() == 'null':
-                                        patrimonio = None
-                                        
-                                    encontrados_dia.append((
-                                        billetera_nombre,
-                                        fondo.get('fondo'),
-                                        fecha_str_db, # Usamos formato DB
-                                        float(fondo.get('vcp', 0)),
-                                        patrimonio,
-                                        fondo.get('horizonte')
-                                    ))
-                                    billeteras_procesadas_hoy.add(billetera_nombre)
-                                    break
-                
-                # Inserción en DB
-                if encontrados_dia:
-                    for registro in encontrados_dia:
-                        insert_query = sql.SQL("""
-                            INSERT INTO {} (billetera, fondo, fecha, vcp, patrimonio, horizonte)
-                            VALUES (%s, %s, %s, %s, %s, %s)
-                            ON CONFLICT (fondo, fecha) DO NOTHING
-                        """).format(sql.Identifier(NOMBRE_TABLA))
-                        
-                        cur.execute(insert_query, registro)
-                        if cur.rowcount > 0:
-                            nuevos_registros += 1
-                    
-                    conn.commit() # Guardar cambios del día
-                    print(f"✅ Insertados: {len(encontrados_dia)}")
-                else:
-                    print("⚠️ Datos vacíos para billeteras objetivo")
-
-            except requests.exceptions.RequestException as e:
-                print(f"❌ Error API: {e}")
-            
-            # Pequeña pausa para no saturar
-            time.sleep(0.2)
+                encontrados_dia = filtrar_billeteras_objetivo(response.json(), fecha_str_db)
+            except (ValueError, TypeError, AttributeError) as e:
+                print(f"⏳ {fecha_str_api}: ❌ Respuesta inválida: {e}")
+                continue
+            progreso.append((fecha_str_db, "cargado", len(encontrados_dia)))
+            procesadas.append(response)
+
+            if encontrados_dia:
+                registros_a_cargar.extend(encontrados_dia)
+                print(f"⏳ {fecha_str_api}: ✅ Encontrados: {len(encontrados_dia)}")
+            else:
+                print(f"⏳ {fecha_str_api}: ⚠️ Datos vacíos para billeteras objetivo")
+
+        # Inserción en DB: una sola carga masiva para todos los días
+        # (en modo forzado se pisan los valores que la API haya corregido)
+        # Datos y checkpoint viajan en la misma transacción
+        with transaccion() as cur:
+            nuevos_registros, actualizados = cargar_masivo(
+                cur,
+                NOMBRE_TABLA,
+                ["billetera", "fondo", "fecha", "vcp", "patrimonio", "horizonte"],
+                registros_a_cargar,
+                claves=["fondo", "fecha"],
+                actualizar=["billetera", "vcp", "patrimonio", "horizonte"] if forzar else [],
+            )
+
+            # Fuera del backfill solo se recuerdan los días sin datos (no se vuelven a pedir)
+            if not registrar_progreso:
+                progreso = [fila for fila in progreso if fila[1] == "sin_datos"]
+            progreso_nuevos, progreso_actualizados = cargar_masivo(
+                cur,
+                NOMBRE_TABLA_PROGRESO,
+                ["fecha", "estado", "registros"],
+                progreso,
+                claves=["fecha"],
+                actualizar=["estado", "registros"],
+            )
+
+        registrar_filas_modificadas(NOMBRE_TABLA, nuevos_registros + actualizados)
+        registrar_filas_modificadas(NOMBRE_TABLA_PROGRESO, progreso_nuevos + progreso_actualizados)
+        motor.cliente.confirmar(*procesadas)
 
         print("-" * 60)
-        print(f"🚀 Proceso de carga finalizado. Nuevos registros: {nuevos_registros}")
+        print(f"🚀 Proceso de carga finalizado. Nuevos registros: {nuevos_registros}"
+              + (f" | Actualizados: {actualizados}" if forzar else ""))
+
+        return nuevos_registros
 
     except psycopg2.Error as e:
         print(f"❌ Error crítico de Base de Datos: {e}")
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
+        raise
+
+
+def backfill_historico(desde, hasta=None, dias_por_bloque=DIAS_POR_BLOQUE,
+                       bloques_en_paralelo=BLOQUES_EN_PARALELO, forzar=False) -> int:
+    """
+    Carga histórica de FCI para un rango largo de fechas.
+
+    Divide el rango en bloques de `dias_por_bloque` días y procesa varios
+    bloques en paralelo (cada uno con su conexión, todos con el mismo motor
+    HTTP). Cada bloque registra sus fechas en la tabla de progreso al
+    hacer commit, así una corrida cortada retoma donde quedó.
+
+    Args:
+        forzar (bool): Vuelve a descargar todo el rango (ignora lo cargado y
+            el progreso registrado) y pisa los valores existentes.
+
+    Returns:
+        int: Cantidad de registros nuevos
+    """
+    if dias_por_bloque < 1:
+        raise ValueError(f"dias_por_bloque debe ser al menos 1 (se recibió {dias_por_bloque})")
+
+    hasta = hasta or datetime.now().date()
+    bloques = []
+    inicio = desde
+    while inicio <= hasta:
+        fin = min(inicio + timedelta(days=dias_por_bloque - 1), hasta)
+        bloques.append((inicio, fin))
+        inicio = fin + timedelta(days=1)
 
-def actualizar_tna_existentes():
-    """Recalcula el TNA para toda la tabla basándose en días reales transcurridos."""
+    print(f"🗂️  BACKFILL {desde} -> {hasta}: {len(bloques)} bloques de hasta {dias_por_bloque} días")
+
+    motor = obtener_motor()
+    nuevos_registros = 0
+    with ThreadPoolExecutor(max_workers=max(1, bloques_en_paralelo)) as executor:
+        futuros = {
+            executor.submit(
+                procesar_api_e_insertar,
+                desde=inicio_bloque,
+                hasta=fin_bloque,
+                forzar=forzar,
+                registrar_progreso=True,
+                motor=motor,
+            ): (inicio_bloque, fin_bloque)
+            for inicio_bloque, fin_bloque in bloques
+        }
+        for futuro in as_completed(futuros):
+            inicio_bloque, fin_bloque = futuros[futuro]
+            try:
+                nuevos_registros += futuro.result()
+                print(f"✅ Bloque {inicio_bloque} -> {fin_bloque} terminado")
+            except Exception as e:
+                print(f"❌ Bloque {inicio_bloque} -> {fin_bloque} falló: {e}")
+
+    print(f"🚀 Backfill finalizado. Nuevos registros: {nuevos_registros}")
+    return nuevos_registros
+
+def actualizar_tna_existentes(completo=False):
+    """
+    Recalcula el TNA basándose en días reales transcurridos entre cotizaciones.
+
+    Modo incremental (por defecto): la marca de agua de cada fondo es su
+    fecha más antigua sin TNA (sin contar el primer registro de la serie,
+    que nunca tiene día anterior). Solo se recalculan las filas desde esa
+    fecha en adelante, así una fila nueva intercalada también corrige la
+    del día siguiente.
+
+    Args:
+        completo (bool): Si es True recalcula toda la tabla.
+
+    Returns:
+        int: Cantidad de registros actualizados
+    """
     
-    conn = None
     try:
-        conn = psycopg2.connect(DATABASE_URL)
-        cur = conn.cursor()
-        
-        # Obtenemos todo ordenado por Fondo y Fecha para poder comparar con el día anterior
+        if completo:
+            marcas_de_agua = f"""
+            SELECT fondo, MIN(fecha) AS desde
+            FROM {NOMBRE_TABLA}
+            GROUP BY fondo
+            """
+        else:
+            marcas_de_agua = f"""
+            SELECT r.fondo, MIN(r.fecha) AS desde
+            FROM {NOMBRE_TABLA} r
+            WHERE r.tna IS NULL
+              AND r.fecha > (SELECT MIN(p.fecha) FROM {NOMBRE_TABLA} p WHERE p.fondo = r.fondo)
+            GROUP BY r.fondo
+            """
+
+        # Una sola sentencia: LAG() trae el VCP y la fecha anterior de cada fondo.
+        # Se lee también la última fila previa a la marca de agua para tener su "día anterior".
+        # Fórmula (igual que antes): ((VCP_hoy / VCP_ayer) ^ (365 / días) - 1) * 100
         query = f"""
-        SELECT id, fondo, fecha, vcp 
-        FROM {NOMBRE_TABLA}
-        ORDER BY fondo, fecha ASC
+        WITH marcas AS ({marcas_de_agua}),
+        serie AS (
+            SELECT
+                r.id,
+                r.fecha,
+                m.desde,
+                r.vcp::float8 AS vcp,
+                LAG(r.vcp::float8) OVER w AS vcp_anterior,
+                LAG(r.fecha) OVER w AS fecha_anterior
+            FROM {NOMBRE_TABLA} r
+            JOIN marcas m ON m.fondo = r.fondo
+            WHERE r.fecha >= COALESCE(
+                (SELECT MAX(a.fecha) FROM {NOMBRE_TABLA} a WHERE a.fondo = m.fondo AND a.fecha < m.desde),
+                m.desde
+            )
+            WINDOW w AS (PARTITION BY r.fondo ORDER BY r.fecha)
+        )
+        UPDATE {NOMBRE_TABLA} t
+        SET tna = (POWER(s.vcp / s.vcp_anterior, 365.0 / (s.fecha - s.fecha_anterior)) - 1) * 100
+        FROM serie s
+        WHERE t.id = s.id
+          AND s.fecha >= s.desde
+          AND s.vcp_anterior > 0
+          AND s.fecha > s.fecha_anterior
         """
-        cur.execute(query)
-        registros = cur.fetchall()
-        
-        vcp_anterior_por_fondo = {}
-        fecha_anterior_por_fondo = {}
-        registros_actualizados = 0
-        
-        for id_reg, fondo, fecha, vcp_hoy in registros:
-            vcp_hoy = float(vcp_hoy)
-            vcp_ayer = vcp_anterior_por_fondo.get(fondo)
-            fecha_ayer = fecha_anterior_por_fondo.get(fondo)
-            
-            tna_calculado = None
-            
-            if vcp_ayer is not None and fecha_ayer is not None:
-                # calcular dias reales entre cotizaciones (fines de semana)
-                dias_transcurridos = (fecha - fecha_ayer).days
-                
-                if dias_transcurridos > 0:
-                    # Rendimiento del periodo
-                    retorno_periodo = (vcp_hoy / vcp_ayer) - 1
-                    
-                    # Tasa Efectiva Diaria Promedio
-                    retorno_diario_promedio = (1 + retorno_periodo)**(1/dias_transcurridos) - 1
-                    
-                    # Tasa Nominal Anual (TNA)
-                    tna_calculado = ((1 + retorno_diario_promedio)**365 - 1) * 100
-            
-            # Actualizamos si tenemos un cálculo, o dejamos NULL si es el primer registro
-            if tna_calculado is not None:
-                update_query = f"UPDATE {NOMBRE_TABLA} SET tna = %s WHERE id = %s"
-                cur.execute(update_query, (tna_calculado, id_reg))
-                registros_actualizados += 1
-            
-            # Guardamos estado para la siguiente iteración del loop
-            vcp_anterior_por_fondo[fondo] = vcp_hoy
-            fecha_anterior_por_fondo[fondo] = fecha
-        
-        conn.commit()
+        with transaccion() as cur:
+            cur.execute(query)
+            registros_actualizados = cur.rowcount
+        registrar_filas_modificadas(NOMBRE_TABLA, registros_actualizados)
+
+        modo = "completo" if completo else "incremental"
+        print(f"📐 TNA recalculado ({modo}): {registros_actualizados} registros")
+        return registros_actualizados
         
     except psycopg2.Error as e:
         print(f"❌ Error al actualizar TNA: {e}")
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
+        raise
+
+def _entero_positivo(valor):
+    """Tipo de argparse: entero >= 1"""
+    numero = int(valor)
+    if numero < 1:
+        raise argparse.ArgumentTypeError(f"tiene que ser al menos 1 (se recibió {numero})")
+    return numero
+
 
 # --- EJECUCIÓN PRINCIPAL ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ETL de FCI (API -> PostgreSQL)")
+    parser.add_argument("--desde", type=date.fromisoformat,
+                        help="Primer día a consultar (YYYY-MM-DD). Por defecto: últimos DIAS_A_CONSULTAR días")
+    parser.add_argument("--hasta", type=date.fromisoformat,
+                        help="Último día a consultar (YYYY-MM-DD). Por defecto: hoy")
+    parser.add_argument("--force", action="store_true",
+                        help="Vuelve a descargar todo el rango aunque ya esté cargado")
+    parser.add_argument("--tna-completo", action="store_true",
+                        help="Recalcula el TNA de toda la tabla en lugar de solo las filas nuevas")
+    parser.add_argument("--backfill", action="store_true",
+                        help="Carga histórica reanudable del rango --desde/--hasta, en bloques paralelos")
+    parser.add_argument("--dias-por-bloque", type=_entero_positivo, default=DIAS_POR_BLOQUE,
+                        help="Tamaño de cada bloque del backfill (días)")
+    parser.add_argument("--bloques-en-paralelo", type=_entero_positivo, default=BLOQUES_EN_PARALELO,
+                        help="Cantidad de bloques del backfill procesados a la vez")
+    args = parser.parse_args()
+
+    if args.backfill and not args.desde:
+        parser.error("--backfill requiere --desde")
+
     # 1. Preparar DB
     crear_tabla_postgres()
     
     # 2. Descargar de API e Insertar (Sin CSV)
-    procesar_api_e_insertar()
+    if args.backfill:
+        backfill_historico(
+            args.desde,
+            args.hasta,
+            dias_por_bloque=args.dias_por_bloque,
+            bloques_en_paralelo=args.bloques_en_paralelo,
+            forzar=args.force,
+        )
+    else:
+        procesar_api_e_insertar(desde=args.desde, hasta=args.hasta, forzar=args.force)
     
     # 3. Calcular matemáticas financieras (TNA)
-    actualizar_tna_existentes()
+    # Si se forzó la descarga pudieron cambiar VCP ya cargados: se recalcula todo
+    actualizar_tna_existentes(completo=args.tna_completo or args.force)
 
 
@@ -3,24 +3,152 @@ import psycopg2
 import json
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-import os
+
+from carga_masiva import cargar_masivo, registrar_filas_modificadas
+from conexion_db import transaccion
+from motor_extraccion import obtener_motor
+from almacen_crudo import guardar_crudo
 
 
 # Cargar variables de entorno
 load_dotenv()
 
-# --- CONFIGURACIÓN BASE DE DATOS ---
+# Índice diario compuesto (lo lee el dashboard en lugar de recalcularlo en cada sesión)
+NOMBRE_TABLA_INDICE = "inflacion_diaria"
+
+
+def transformar_inflacion(datos_api: list, fecha_referencia=None) -> list:
+    """
+    Se queda con los últimos 12 meses de la respuesta de la API.
+
+    Args:
+        fecha_referencia (datetime): Desde dónde se cuentan los 12 meses (por defecto ahora).
+
+    Returns:
+        list: [{'fecha': 'YYYY-MM-DD', 'valor': float}, ...]
+    """
+    inflacion = []
+    fecha_limite = (fecha_referencia or datetime.now()) - timedelta(days=365)  # Hace 12 meses
+
+    for dato in datos_api:
+        fecha_dato = datetime.strptime(dato['fecha'], '%Y-%m-%d')
+
+        # Filtrar solo últimos 12 meses
+        if fecha_dato >= fecha_limite:
+            inflacion.append({
+                'fecha': dato['fecha'],
+                'valor': float(dato['valor'])
+            })
+
+    return inflacion
+
+
+def actualizar_indice_diario(cur) -> int:
+    """
+    Mantiene la tabla del índice diario de inflación de forma incremental.
+
+    LÓGICA:
+        Toma el dato mensual (ej: 4% en enero), lo convierte a una tasa diaria
+        equivalente (1 + TasaMensual)^(1/30) y acumula día a día.
+        Solo se recalcula desde el primer mes nuevo o corregido: si llegó un mes
+        nuevo, se agregan únicamente sus días. Los meses sin dato entre dos
+        publicados usan el último valor conocido.
+
+    No hace commit: la transacción la maneja quien llama, que registra los
+    días devueltos en filas modificadas después del COMMIT.
+
+    Returns:
+        int: Cantidad de días (re)calculados
+    """
+    # 1. Primer mes cuyo valor no coincide con lo guardado (o que todavía no está).
+    # Si el mes nuevo deja un hueco (mes sin publicar en el medio), se arranca
+    # desde el día siguiente al último guardado para cubrirlo.
+    cur.execute(f"""
+        WITH mensual AS (
+            SELECT date_trunc('month', fecha)::date AS mes, AVG(valor)::DECIMAL(10, 2) AS valor
+            FROM inflacion
+            GROUP BY 1
+        ),
+        guardado AS (
+            SELECT DISTINCT date_trunc('month', fecha)::date AS mes, valor_mensual
+            FROM {NOMBRE_TABLA_INDICE}
+        ),
+        distinto AS (
+            SELECT MIN(m.mes) AS mes
+            FROM mensual m
+            LEFT JOIN guardado g ON g.mes = m.mes
+            WHERE g.valor_mensual IS DISTINCT FROM m.valor
+        )
+        SELECT
+            (SELECT MIN(mes) FROM mensual),
+            -- Días guardados anteriores al primer mes que queda en la tabla mensual
+            EXISTS (SELECT 1 FROM {NOMBRE_TABLA_INDICE} WHERE fecha < (SELECT MIN(mes) FROM mensual)),
+            CASE WHEN distinto.mes IS NOT NULL
+                 THEN LEAST(distinto.mes, (SELECT MAX(fecha) + 1 FROM {NOMBRE_TABLA_INDICE}))
+            END
+        FROM distinto
+    """)
+    primer_mes, huerfanos, desde = cur.fetchone()
+    if primer_mes is None:
+        return 0
+    if huerfanos:
+        # La tabla mensual perdió meses del principio (ej: TRUNCATE y recarga parcial):
+        # el índice acumulado ya no arranca donde corresponde, se rehace completo
+        cur.execute(f"DELETE FROM {NOMBRE_TABLA_INDICE}")
+        desde = primer_mes
+    elif desde is None:
+        return 0
+
+    # 2. Se rehacen los días desde ese mes, partiendo del índice del día anterior
+    cur.execute(f"DELETE FROM {NOMBRE_TABLA_INDICE} WHERE fecha >= %s", (desde,))
+    cur.execute(f"""
+        INSERT INTO {NOMBRE_TABLA_INDICE} (fecha, valor_mensual, indice)
+        WITH mensual AS (
+            SELECT date_trunc('month', fecha)::date AS mes, AVG(valor)::DECIMAL(10, 2) AS valor
+            FROM inflacion
+            GROUP BY 1
+        ),
+        dias AS (
+            -- Arranca en el último mes publicado hasta `desde` para tener de dónde rellenar
+            SELECT generate_series(
+                (SELECT MAX(mes) FROM mensual WHERE mes <= %(desde)s),
+                (SELECT MAX(mes) FROM mensual) + INTERVAL '1 month - 1 day',
+                INTERVAL '1 day'
+            )::date AS fecha
+        ),
+        con_valor AS (
+            SELECT d.fecha, m.valor,
+                   COUNT(m.valor) OVER (ORDER BY d.fecha) AS grupo
+            FROM dias d
+            LEFT JOIN mensual m ON m.mes = date_trunc('month', d.fecha)::date
+        ),
+        relleno AS (
+            SELECT fecha, MAX(valor) OVER (PARTITION BY grupo) AS valor
+            FROM con_valor
+        )
+        SELECT fecha, valor,
+               COALESCE(
+                   (SELECT indice FROM {NOMBRE_TABLA_INDICE} WHERE fecha < %(desde)s ORDER BY fecha DESC LIMIT 1),
+                   1.0
+               ) * EXP(SUM(LN(1 + valor::float8 / 100) / 30) OVER (ORDER BY fecha))
+        FROM relleno
+        WHERE fecha >= %(desde)s
+    """, {"desde": desde})
+    dias = cur.rowcount
+
+    print(f"📅 Índice diario de inflación: {dias} días calculados desde {desde}")
+    return dias
 
-DATABASE_URL = os.getenv("DATABASE_URL_NEON")
 
 class ExtractorInflacion:
     """Extrae historial de inflacion desde APIs públicas"""
     
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        # Motor del proceso: respeta los límites por host compartidos con las demás etapas
+        self.motor = obtener_motor()
+        self.cliente = self.motor.cliente
+        # Última respuesta procesada: su ETag se guarda recién cuando los datos están en la base
+        self.respuesta = None
     
     def obtener_datos_inflacion(self) -> list:
         """
@@ -32,30 +160,30 @@ class ExtractorInflacion:
                 'fecha': "string",
                 'valor': "0"
             }
+            None si la API respondió 304 (sin cambios desde la última carga)
         """
+        # Solo se pide condicional si la tabla tiene datos: el cache de ETag es
+        # independiente de la base y un 304 con la tabla vacía la dejaría sin cargar
+        with transaccion() as cur:
+            cur.execute("SELECT EXISTS (SELECT 1 FROM inflacion)")
+            hay_datos = cur.fetchone()[0]
+
         try:
             print("🔄 Consultando API...")
             
             url = "https://api.argentinadatos.com/v1/finanzas/indices/inflacion"
-            response = self.session.get(url, timeout=10)
+            response = self.motor.obtener(url, condicional=hay_datos)
+            if self.cliente.sin_cambios(response):
+                return None
             response.raise_for_status()
             
             datos_api = response.json()
+            guardar_crudo("inflacion", datetime.now().date(), "inflacion", response.content)
             
             # Procesar y estructurar los datos
-            inflacion = []
-            fecha_limite = datetime.now() - timedelta(days=365)  # Hace 12 meses
-
-            for dato in datos_api:
-                fecha_dato = datetime.strptime(dato['fecha'], '%Y-%m-%d')
-    
-                # Filtrar solo últimos 12 meses
-                if fecha_dato >= fecha_limite:
-                    inflacion.append({
-                        'fecha': dato['fecha'],
-                        'valor': float(dato['valor'])
-                    })
+            inflacion = transformar_inflacion(datos_api)
             
+            self.respuesta = response
             return inflacion
             
         except requests.exceptions.RequestException as e:
@@ -71,10 +199,7 @@ class ExtractorInflacion:
     def crear_tabla_db(self):
         """Crea la tabla en PostgreSQL --> si no existe"""
         try:
-            conn = psycopg2.connect(DATABASE_URL)
-            cur = conn.cursor()
-            
-            query = """
+            query = f"""
             CREATE TABLE IF NOT EXISTS inflacion (
                 id SERIAL PRIMARY KEY,
                 fecha DATE NOT NULL UNIQUE,
@@ -85,63 +210,72 @@ class ExtractorInflacion:
             
             -- Índice para búsquedas rápidas por fecha
             CREATE INDEX IF NOT EXISTS idx_inflacion_fecha ON inflacion(fecha DESC);
+
+            -- Un registro por día: tasa mensual vigente e índice acumulado
+            CREATE TABLE IF NOT EXISTS {NOMBRE_TABLA_INDICE} (
+                fecha DATE PRIMARY KEY,
+                valor_mensual DECIMAL(10, 2) NOT NULL,
+                indice DOUBLE PRECISION NOT NULL
+            );
             """
             
-            cur.execute(query)
-            conn.commit()
+            with transaccion() as cur:
+                cur.execute(query)
             
             
         except psycopg2.Error as e:
             print(f"❌ Error al crear tabla: {e}")
-        finally:
-            if 'conn' in locals() and conn:
-                cur.close()
-                conn.close()
+            raise
     
     def guardar_en_db(self, inflacion: list) -> int:
         """
         Returns:
-            int: Cantidad de registros guardados
+            int: Cantidad de registros insertados o modificados
         """
+        if inflacion is None:
+            print("⏭️  Inflación sin cambios desde la última carga")
+            # El índice igual se verifica (por si todavía no existía)
+            try:
+                with transaccion() as cur:
+                    dias = actualizar_indice_diario(cur)
+                registrar_filas_modificadas(NOMBRE_TABLA_INDICE, dias)
+            except psycopg2.Error as e:
+                print(f"❌ Error al actualizar el índice diario: {e}")
+                raise
+            return 0
+
         if not inflacion:
             print("⚠️  No hay datos de inflacion para guardar")
             return 0
         
         try:
-            conn = psycopg2.connect(DATABASE_URL)
-            cur = conn.cursor()
+            # 2. INSERTAR DATOS NUEVOS (COPY + un único upsert)
+            filas = [(dato['fecha'], dato['valor']) for dato in inflacion]
 
-            registros_guardados = 0
-            
-            # 2. INSERTAR DATOS NUEVOS
-            for dato in inflacion:
-                fecha = dato['fecha']
-                valor = dato['valor']
-                
-                query = """
-                INSERT INTO inflacion (fecha, valor)
-                VALUES (%s, %s)
-                ON CONFLICT (fecha) DO UPDATE 
-                SET valor = EXCLUDED.valor, updated_at = CURRENT_TIMESTAMP
-                """
-                
-                cur.execute(query, (fecha, valor))
-                registros_guardados += 1
-            
-            conn.commit()
-            print(f"✅ {registros_guardados} registros de inflación guardados en PostgreSQL")
+            with transaccion() as cur:
+                insertados, actualizados = cargar_masivo(
+                    cur,
+                    "inflacion",
+                    ["fecha", "valor"],
+                    filas,
+                    claves=["fecha"],
+                    actualizar=["valor"],
+                    columna_actualizado="updated_at",
+                )
+                # El índice diario viaja en la misma transacción que los datos mensuales
+                dias = actualizar_indice_diario(cur)
+            registros_guardados = insertados + actualizados
+            registrar_filas_modificadas("inflacion", registros_guardados)
+            registrar_filas_modificadas(NOMBRE_TABLA_INDICE, dias)
+            self.cliente.confirmar(self.respuesta)
+
+            print(f"✅ Inflación en PostgreSQL: {insertados} nuevos, {actualizados} actualizados")
             
             return registros_guardados
             
         except psycopg2.Error as e:
             print(f"❌ Error de Base de Datos: {e}")
-            if 'conn' in locals():
-                conn.rollback()
-            return 0
-        finally:
-            if 'conn' in locals() and conn:
-                cur.close()
-                conn.close()
+            raise
 
 if __name__ == "__main__":
     extractor = ExtractorInflacion()
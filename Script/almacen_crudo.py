@@ -0,0 +1,79 @@
+import gzip
+import json
+import os
+
+# --- CONFIGURACIÓN DEL ALMACÉN CRUDO ---
+
+# Carpeta raíz de las respuestas crudas de las APIs
+DIRECTORIO_CRUDO = os.getenv("ETL_CRUDO_DIR", "datos_crudos")
+
+# "0" desactiva el guardado (las ETL siguen funcionando igual)
+GUARDAR_CRUDO = os.getenv("ETL_GUARDAR_CRUDO", "1") != "0"
+
+
+# ESTRUCTURA:
+#   datos_crudos/<fuente>/<YYYY-MM-DD>/<clave>.json.gz
+#
+# La fecha de la partición es la fecha a la que corresponden los datos:
+# el día consultado en FCI y el día de la descarga en las fuentes que
+# devuelven la foto "actual" (plazo fijo) o el historial completo (dólar, inflación).
+
+
+def _ruta(fuente, fecha, clave, directorio=DIRECTORIO_CRUDO):
+    return os.path.join(directorio, fuente, str(fecha), f"{clave}.json.gz")
+
+
+def guardar_crudo(fuente: str, fecha, clave: str, contenido: bytes, directorio=DIRECTORIO_CRUDO):
+    """
+    Guarda comprimido el cuerpo de una respuesta tal como llegó de la API.
+
+    Si ya existe un archivo para la misma fuente, fecha y clave se reemplaza
+    (queda la última descarga del día). Un error de disco no corta el ETL.
+    """
+    if not GUARDAR_CRUDO:
+        return
+    ruta = _ruta(fuente, fecha, clave, directorio)
+    try:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f"{ruta}.tmp"
+        with gzip.open(temporal, "wb") as archivo:
+            archivo.write(contenido)
+        os.replace(temporal, ruta)
+    except OSError as e:
+        print(f"⚠️ No se pudo guardar la respuesta cruda ({fuente}/{fecha}/{clave}): {e}")
+
+
+def listar_crudos(fuente: str, desde=None, hasta=None, directorio=DIRECTORIO_CRUDO) -> list:
+    """
+    Archivos guardados de una fuente, del más viejo al más nuevo.
+
+    Args:
+        desde (date): Primera partición a incluir (opcional).
+        hasta (date): Última partición a incluir (opcional).
+
+    Returns:
+        list: Tuplas (fecha_str, clave, ruta)
+    """
+    carpeta = os.path.join(directorio, fuente)
+    if not os.path.isdir(carpeta):
+        return []
+
+    archivos = []
+    for fecha_str in sorted(os.listdir(carpeta)):
+        if desde and fecha_str < str(desde):
+            continue
+        if hasta and fecha_str > str(hasta):
+            continue
+        particion = os.path.join(carpeta, fecha_str)
+        if not os.path.isdir(particion):
+            continue
+        for nombre in sorted(os.listdir(particion)):
+            if nombre.endswith(".json.gz"):
+                archivos.append((fecha_str, nombre[:-len(".json.gz")], os.path.join(particion, nombre)))
+    return archivos
+
+
+def leer_crudo(ruta: str):
+    """Devuelve el JSON ya decodificado de un archivo crudo"""
+    with gzip.open(ruta, "rb") as archivo:
+        return json.loads(archivo.read())
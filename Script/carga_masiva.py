@@ -0,0 +1,175 @@
+from psycopg2 import sql
+import threading
+import csv
+import io
+import os
+
+# --- CONFIGURACIÓN DE LA CARGA MASIVA ---
+
+# Cantidad de filas que se envían por cada COPY al servidor
+TAMANO_LOTE = int(os.getenv("ETL_TAMANO_LOTE", "5000"))
+
+# Marcador de NULL dentro del CSV que viaja por COPY
+_NULO = "\\N"
+
+# Filas realmente escritas por tabla en el proceso (el orquestador publica una nueva versión si hubo cambios)
+_lock_contador = threading.Lock()
+_filas_modificadas = {}
+
+
+def registrar_filas_modificadas(tabla, cantidad):
+    """
+    Suma escrituras ya confirmadas. Se llama después de que `transaccion()`
+    hizo COMMIT: si la transacción se deshace, sus filas no cuentan.
+    """
+    if cantidad <= 0:
+        return
+    with _lock_contador:
+        _filas_modificadas[tabla] = _filas_modificadas.get(tabla, 0) + cantidad
+
+
+def filas_modificadas() -> dict:
+    """
+    Returns:
+        dict: {tabla: filas insertadas o actualizadas desde el último reinicio}
+    """
+    with _lock_contador:
+        return dict(_filas_modificadas)
+
+
+def reiniciar_filas_modificadas():
+    with _lock_contador:
+        _filas_modificadas.clear()
+
+
+def _lote_csv(filas) -> io.StringIO:
+    """Serializa un lote de filas a CSV en memoria (None -> NULL)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for fila in filas:
+        writer.writerow([_NULO if valor is None else valor for valor in fila])
+    buffer.seek(0)
+    return buffer
+
+
+def cargar_masivo(cur, tabla, columnas, filas, claves=(), actualizar=(),
+                  columna_actualizado=None, tamano_lote=TAMANO_LOTE) -> tuple:
+    """
+    Carga filas en una tabla con COPY + un único INSERT ... ON CONFLICT.
+
+    ESTRATEGIA:
+        1. Crea una tabla temporal "staging" con las mismas columnas.
+        2. Envía las filas por COPY FROM STDIN en lotes de `tamano_lote`.
+        3. Hace el merge contra la tabla real en una sola sentencia.
+
+    No hace commit: la transacción la maneja quien llama, que también registra
+    las filas devueltas (registrar_filas_modificadas) una vez confirmadas.
+
+    Args:
+        cur: Cursor de psycopg2.
+        tabla (str): Tabla destino.
+        columnas (list): Columnas a cargar, en el mismo orden que cada fila.
+        filas (iterable): Tuplas con los valores.
+        claves (list): Columnas del UNIQUE para el ON CONFLICT.
+            Vacío = INSERT simple sin manejo de conflictos.
+        actualizar (list): Columnas a pisar si la fila ya existe.
+            Vacío = ON CONFLICT DO NOTHING.
+        columna_actualizado (str): Columna de auditoría que se marca con
+            CURRENT_TIMESTAMP cuando una fila existente cambia (ej: 'updated_at').
+
+    Returns:
+        tuple: (insertados, actualizados). Las filas que ya existían sin
+        cambios no cuentan como actualizadas.
+    """
+    tabla_id = sql.Identifier(tabla)
+    # Siempre en el esquema temporal de la sesión: un DROP sin calificar podría
+    # resolver (por el search_path) a una tabla real llamada igual
+    staging_id = sql.Identifier("pg_temp", f"staging_{tabla}")
+    cols = sql.SQL(", ").join(map(sql.Identifier, columnas))
+
+    # 1. Tabla temporal con los mismos tipos que la tabla real (sin defaults ni constraints)
+    cur.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(staging_id))
+    cur.execute(sql.SQL(
+        "CREATE TEMP TABLE {} ON COMMIT DROP AS SELECT {} FROM {} WITH NO DATA"
+    ).format(staging_id, cols, tabla_id))
+    # _orden conserva el orden de llegada para quedarnos con la última versión de cada clave
+    cur.execute(sql.SQL("ALTER TABLE {} ADD COLUMN _orden BIGSERIAL").format(staging_id))
+
+    # 2. COPY por lotes
+    copy_query = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv, NULL '\\N')").format(
+        staging_id, cols
+    ).as_string(cur)
+
+    lote = []
+    total_filas = 0
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= tamano_lote:
+            cur.copy_expert(copy_query, _lote_csv(lote))
+            total_filas += len(lote)
+            lote = []
+    if lote:
+        cur.copy_expert(copy_query, _lote_csv(lote))
+        total_filas += len(lote)
+
+    if total_filas == 0:
+        cur.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(staging_id))
+        return 0, 0
+
+    # 3. Merge en una sola sentencia
+    if claves:
+        claves_sql = sql.SQL(", ").join(map(sql.Identifier, claves))
+        origen = sql.SQL("SELECT DISTINCT ON ({claves}) {cols} FROM {staging} ORDER BY {claves}, _orden DESC").format(
+            claves=claves_sql, cols=cols, staging=staging_id
+        )
+    else:
+        origen = sql.SQL("SELECT {} FROM {} ORDER BY _orden").format(cols, staging_id)
+
+    if not claves:
+        conflicto = sql.SQL("")
+    elif not actualizar:
+        conflicto = sql.SQL("ON CONFLICT ({}) DO NOTHING").format(claves_sql)
+    else:
+        asignaciones = [
+            sql.SQL("{col} = EXCLUDED.{col}").format(col=sql.Identifier(c)) for c in actualizar
+        ]
+        if columna_actualizado:
+            asignaciones.append(
+                sql.SQL("{} = CURRENT_TIMESTAMP").format(sql.Identifier(columna_actualizado))
+            )
+        # Solo se actualiza (y se cuenta) si algún valor realmente cambió
+        actuales = sql.SQL(", ").join(
+            sql.SQL("{}.{}").format(tabla_id, sql.Identifier(c)) for c in actualizar
+        )
+        nuevos = sql.SQL(", ").join(
+            sql.SQL("EXCLUDED.{}").format(sql.Identifier(c)) for c in actualizar
+        )
+        conflicto = sql.SQL(
+            "ON CONFLICT ({claves}) DO UPDATE SET {asignaciones} "
+            "WHERE ROW({actuales}) IS DISTINCT FROM ROW({nuevos})"
+        ).format(
+            claves=claves_sql,
+            asignaciones=sql.SQL(", ").join(asignaciones),
+            actuales=actuales,
+            nuevos=nuevos,
+        )
+
+    # xmax = 0 solo en filas recién insertadas; en un UPDATE guarda el id de la transacción
+    merge_query = sql.SQL("""
+        WITH merge AS (
+            INSERT INTO {tabla} ({cols})
+            {origen}
+            {conflicto}
+            RETURNING (xmax = 0) AS insertado
+        )
+        SELECT
+            COUNT(*) FILTER (WHERE insertado),
+            COUNT(*) FILTER (WHERE NOT insertado)
+        FROM merge
+    """).format(tabla=tabla_id, cols=cols, origen=origen, conflicto=conflicto)
+
+    cur.execute(merge_query)
+    insertados, actualizados = cur.fetchone()
+
+    cur.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(staging_id))
+    return insertados, actualizados
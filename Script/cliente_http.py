@@ -0,0 +1,132 @@
+import requests
+from requests.adapters import HTTPAdapter
+import threading
+import hashlib
+import json
+import os
+
+# --- CONFIGURACIÓN DEL CLIENTE HTTP ---
+
+# Carpeta donde se guardan los validadores (ETag / Last-Modified) de cada URL
+DIRECTORIO_CACHE = os.getenv("ETL_CACHE_HTTP_DIR", ".cache_http")
+
+# "0" desactiva las peticiones condicionales (siempre se descarga todo)
+CACHE_ACTIVO = os.getenv("ETL_CACHE_HTTP", "1") != "0"
+
+# Conexiones keep-alive que se mantienen abiertas por host
+TAMANO_POOL = int(os.getenv("ETL_HTTP_POOL", "10"))
+
+TIMEOUT = 10
+
+
+class CacheValidadores:
+    """
+    Cache en disco de los validadores HTTP de cada URL.
+
+    Solo se guardan ETag y Last-Modified (no el cuerpo): si el servidor
+    responde 304 la respuesta no se vuelve a procesar.
+    """
+
+    def __init__(self, directorio=DIRECTORIO_CACHE):
+        self.directorio = directorio
+        self._lock = threading.Lock()
+
+    def _ruta(self, url):
+        nombre = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directorio, f"{nombre}.json")
+
+    def leer(self, url) -> dict:
+        """
+        Returns:
+            dict: {'url', 'etag', 'last_modified'} o None si la URL no está en cache
+        """
+        try:
+            with open(self._ruta(url), encoding="utf-8") as archivo:
+                return json.load(archivo)
+        except (OSError, ValueError):
+            return None
+
+    def guardar(self, url, etag, last_modified):
+        entrada = {"url": url, "etag": etag, "last_modified": last_modified}
+        ruta = self._ruta(url)
+        with self._lock:
+            os.makedirs(self.directorio, exist_ok=True)
+            # Escritura atómica: un corte a mitad de camino no deja un JSON roto
+            temporal = f"{ruta}.tmp"
+            with open(temporal, "w", encoding="utf-8") as archivo:
+                json.dump(entrada, archivo)
+            os.replace(temporal, ruta)
+
+
+class ClienteHTTP:
+    """Sesión HTTP compartida por todos los ETL (keep-alive, gzip y peticiones condicionales)"""
+
+    def __init__(self, tamano_pool=TAMANO_POOL, timeout=TIMEOUT, cache=None, cache_activo=CACHE_ACTIVO):
+        self.timeout = timeout
+        self.cache = cache or CacheValidadores()
+        self.cache_activo = cache_activo
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Accept-Encoding': 'gzip, deflate',
+        })
+        adaptador = HTTPAdapter(pool_connections=tamano_pool, pool_maxsize=tamano_pool)
+        self.session.mount("https://", adaptador)
+        self.session.mount("http://", adaptador)
+
+    def get(self, url, condicional=True, timeout=None) -> requests.Response:
+        """
+        GET con If-None-Match / If-Modified-Since si la URL ya está en cache.
+
+        No llama a raise_for_status(). Si el servidor responde 304 el
+        contenido no cambió desde la última carga confirmada (ver `sin_cambios`).
+        """
+        headers = {}
+        if condicional and self.cache_activo:
+            entrada = self.cache.leer(url)
+            if entrada:
+                if entrada.get("etag"):
+                    headers["If-None-Match"] = entrada["etag"]
+                if entrada.get("last_modified"):
+                    headers["If-Modified-Since"] = entrada["last_modified"]
+
+        response = self.session.get(url, headers=headers, timeout=timeout or self.timeout)
+        # Clave original (antes de redirecciones) para confirmar después
+        response.url_cache = url
+        return response
+
+    @staticmethod
+    def sin_cambios(response) -> bool:
+        """True si el servidor respondió 304 Not Modified"""
+        return response is not None and response.status_code == 304
+
+    def confirmar(self, *respuestas):
+        """
+        Guarda los validadores de las respuestas ya procesadas.
+
+        Se llama DESPUÉS de que los datos quedaron guardados en la base:
+        si la carga falla, la próxima corrida vuelve a descargar todo.
+        """
+        if not self.cache_activo:
+            return
+        for response in respuestas:
+            if response is None or response.status_code != 200:
+                continue
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if etag or last_modified:
+                self.cache.guardar(getattr(response, "url_cache", response.url), etag, last_modified)
+
+
+_cliente = None
+_lock_cliente = threading.Lock()
+
+
+def obtener_cliente() -> ClienteHTTP:
+    """Cliente único del proceso (el orquestador comparte el pool entre todas las etapas)"""
+    global _cliente
+    with _lock_cliente:
+        if _cliente is None:
+            _cliente = ClienteHTTP()
+        return _cliente
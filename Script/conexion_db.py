@@ -0,0 +1,145 @@
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+from contextlib import contextmanager
+from dotenv import load_dotenv
+import threading
+import time
+import os
+
+load_dotenv()
+
+# --- CONFIGURACIÓN BASE DE DATOS ---
+
+DATABASE_URL = os.getenv("DATABASE_URL_NEON")
+
+# Conexiones máximas abiertas a la vez (etapas del orquestador + bloques del backfill)
+POOL_MAX = int(os.getenv("ETL_POOL_MAX", "8"))
+
+# Tiempo máximo de cada sentencia (milisegundos)
+STATEMENT_TIMEOUT_MS = int(os.getenv("ETL_STATEMENT_TIMEOUT_MS", "120000"))
+
+# Si una conexión estuvo ociosa más que esto (segundos) se verifica con un ping antes de usarla
+SEGUNDOS_PING = 60
+
+# Keepalives TCP: evitan que Neon / la red corten conexiones ociosas sin avisar
+OPCIONES_CONEXION = {
+    "connect_timeout": 15,
+    "keepalives": 1,
+    "keepalives_idle": 30,
+    "keepalives_interval": 10,
+    "keepalives_count": 5,
+    "application_name": "dashboard-finanzas-etl",
+}
+
+_pool = None
+_lock_pool = threading.Lock()
+_cupos = threading.BoundedSemaphore(POOL_MAX)
+_ultimo_uso = {}
+
+# Latencia de adquisición de conexiones (para ver cuánto de la corrida se va en conectar)
+_lock_stats = threading.Lock()
+_stats = {"adquisiciones": 0, "segundos_totales": 0.0, "segundos_max": 0.0}
+
+
+def _obtener_pool() -> ThreadedConnectionPool:
+    global _pool
+    with _lock_pool:
+        if _pool is None:
+            if not DATABASE_URL:
+                raise ValueError("❌ Error: No se encontró la variable DATABASE_URL_NEON en el archivo .env")
+            _pool = ThreadedConnectionPool(0, POOL_MAX, DATABASE_URL, **OPCIONES_CONEXION)
+        return _pool
+
+
+def _conexion_viva(conn) -> bool:
+    """Ping barato solo si la conexión estuvo ociosa un rato"""
+    if conn.closed:
+        return False
+    ultimo_uso = _ultimo_uso.get(id(conn))
+    if ultimo_uso is None or time.monotonic() - ultimo_uso < SEGUNDOS_PING:
+        return True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def _registrar_adquisicion(segundos):
+    with _lock_stats:
+        _stats["adquisiciones"] += 1
+        _stats["segundos_totales"] += segundos
+        _stats["segundos_max"] = max(_stats["segundos_max"], segundos)
+
+
+@contextmanager
+def obtener_conexion():
+    """
+    Presta una conexión del pool y la devuelve al salir.
+
+    Si el pool está lleno espera a que se libere una conexión.
+    """
+    _cupos.acquire()
+    pool = None
+    conn = None
+    try:
+        inicio = time.perf_counter()
+        pool = _obtener_pool()
+        conn = pool.getconn()
+        while not _conexion_viva(conn):
+            pool.putconn(conn, close=True)
+            conn = pool.getconn()
+        _registrar_adquisicion(time.perf_counter() - inicio)
+
+        yield conn
+    finally:
+        if conn is not None:
+            _ultimo_uso[id(conn)] = time.monotonic()
+            pool.putconn(conn, close=bool(conn.closed))
+        _cupos.release()
+
+
+@contextmanager
+def transaccion():
+    """
+    Una corrida = una transacción.
+
+    Entrega un cursor; al salir hace COMMIT, o ROLLBACK si hubo una
+    excepción (que se vuelve a lanzar para que la maneje quien llama).
+    """
+    with obtener_conexion() as conn:
+        cur = conn.cursor()
+        try:
+            # SET LOCAL: solo vale para esta transacción (compatible con poolers en modo transacción)
+            cur.execute("SET LOCAL statement_timeout = %s", (STATEMENT_TIMEOUT_MS,))
+            yield cur
+            conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                pass
+            raise
+        finally:
+            if not cur.closed:
+                cur.close()
+
+
+def estadisticas_conexion() -> dict:
+    """
+    Returns:
+        dict: {'adquisiciones': int, 'segundos_totales': float, 'segundos_max': float}
+    """
+    with _lock_stats:
+        return dict(_stats)
+
+
+def cerrar_pool():
+    """Cierra todas las conexiones del pool (al terminar el proceso)"""
+    global _pool
+    with _lock_pool:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
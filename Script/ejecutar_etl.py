@@ -0,0 +1,226 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from dotenv import load_dotenv
+import argparse
+import schedule
+import time
+import os
+
+import DOLAR_AHORA_ETL
+import DOLAR_hist_ETL
+import plazoFijo_api_ETL
+import FCI_api_ETL
+import INFLACION_api_ETL
+import vista_consolidada
+from carga_masiva import reiniciar_filas_modificadas
+from conexion_db import estadisticas_conexion, cerrar_pool
+from version_datos import registrar_corrida
+
+load_dotenv()
+
+# --- CONFIGURACIÓN DEL ORQUESTADOR ---
+
+# Cantidad de etapas independientes que pueden correr al mismo tiempo
+ETAPAS_EN_PARALELO = int(os.getenv("ETL_ETAPAS_EN_PARALELO", "4"))
+
+# Hora diaria (hora local del proceso) para el modo daemon
+HORA_DIARIA = os.getenv("ETL_HORA_DIARIA", "10:00")
+
+
+# ==================== ETAPAS ====================
+
+def _dolar_ahora():
+    DOLAR_AHORA_ETL.ejecutar_extraccion_completa()
+
+
+def _dolar_hist_tabla():
+    DOLAR_hist_ETL.crear_tabla_historica()
+
+
+def _dolar_hist_carga():
+    DOLAR_hist_ETL.guardar_historial_db()
+
+
+def _plazo_fijo_tabla():
+    plazoFijo_api_ETL.inicializar_tabla_pf()
+
+
+def _plazo_fijo_carga():
+    plazoFijo_api_ETL.guardar_tasas_plazo_fijo()
+
+
+def _fci_tabla():
+    FCI_api_ETL.crear_tabla_postgres()
+
+
+def _fci_ingesta():
+    FCI_api_ETL.procesar_api_e_insertar()
+
+
+def _fci_tna():
+    FCI_api_ETL.actualizar_tna_existentes()
+
+
+def _inflacion():
+    extractor = INFLACION_api_ETL.ExtractorInflacion()
+    extractor.crear_tabla_db()
+    datos = extractor.obtener_datos_inflacion()
+    # None es un 304 (sin cambios); una lista vacía es que la API falló
+    if datos is not None and not datos:
+        raise RuntimeError("No se pudieron obtener los datos de inflación")
+    extractor.guardar_en_db(datos)
+
+
+def _vista_consolidada():
+    vista_consolidada.refrescar_vista_consolidada()
+
+
+# DAG: nombre -> (función, [etapas de las que depende])
+ETAPAS = {
+    "dolar_ahora": (_dolar_ahora, []),
+    "dolar_hist_tabla": (_dolar_hist_tabla, []),
+    "dolar_hist": (_dolar_hist_carga, ["dolar_hist_tabla"]),
+    "plazo_fijo_tabla": (_plazo_fijo_tabla, []),
+    "plazo_fijo": (_plazo_fijo_carga, ["plazo_fijo_tabla"]),
+    "fci_tabla": (_fci_tabla, []),
+    "fci_ingesta": (_fci_ingesta, ["fci_tabla"]),
+    "fci_tna": (_fci_tna, ["fci_ingesta"]),
+    "inflacion": (_inflacion, []),
+    # La vista del dashboard se refresca cuando ya están cargadas todas sus fuentes
+    "vista_consolidada": (_vista_consolidada, ["fci_tna", "dolar_hist", "inflacion"]),
+}
+
+
+# ==================== ORQUESTACIÓN ====================
+
+def validar_dag(etapas: dict):
+    """Verifica que las dependencias existan y que no haya ciclos"""
+    for nombre, (_, dependencias) in etapas.items():
+        for dep in dependencias:
+            if dep not in etapas:
+                raise ValueError(f"La etapa '{nombre}' depende de '{dep}', que no existe")
+
+    visitadas, en_curso = set(), set()
+
+    def _visitar(nombre):
+        if nombre in en_curso:
+            raise ValueError(f"Ciclo de dependencias en la etapa '{nombre}'")
+        if nombre in visitadas:
+            return
+        en_curso.add(nombre)
+        for dep in etapas[nombre][1]:
+            _visitar(dep)
+        en_curso.discard(nombre)
+        visitadas.add(nombre)
+
+    for nombre in etapas:
+        _visitar(nombre)
+
+
+def ejecutar_dag(etapas=ETAPAS, etapas_en_paralelo=ETAPAS_EN_PARALELO) -> dict:
+    """
+    Ejecuta las etapas respetando las dependencias.
+
+    Una etapa arranca apenas terminaron bien todas sus dependencias; las
+    independientes corren en paralelo. Si una etapa falla, las que
+    dependen de ella se omiten.
+
+    Returns:
+        dict: {nombre: {'estado': 'ok' | 'error' | 'omitida', 'segundos': float, 'error': str}}
+    """
+    validar_dag(etapas)
+
+    resultados = {}
+    pendientes = dict(etapas)
+    en_ejecucion = {}
+
+    def _correr(nombre, funcion):
+        inicio = time.perf_counter()
+        try:
+            funcion()
+            return {"estado": "ok", "segundos": time.perf_counter() - inicio, "error": None}
+        except Exception as e:
+            return {"estado": "error", "segundos": time.perf_counter() - inicio, "error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=max(1, etapas_en_paralelo)) as executor:
+        while pendientes or en_ejecucion:
+            # 1. Omitir etapas cuyas dependencias no terminaron bien
+            for nombre, (_, dependencias) in list(pendientes.items()):
+                if any(resultados.get(dep, {}).get("estado") in ("error", "omitida") for dep in dependencias):
+                    resultados[nombre] = {"estado": "omitida", "segundos": 0.0, "error": "dependencia fallida"}
+                    del pendientes[nombre]
+
+            # 2. Lanzar las que ya tienen todas sus dependencias en 'ok'
+            for nombre, (funcion, dependencias) in list(pendientes.items()):
+                if all(resultados.get(dep, {}).get("estado") == "ok" for dep in dependencias):
+                    print(f"▶️  Iniciando etapa: {nombre}")
+                    en_ejecucion[executor.submit(_correr, nombre, funcion)] = nombre
+                    del pendientes[nombre]
+
+            if not en_ejecucion:
+                break
+
+            # 3. Esperar a que termine alguna
+            terminadas, _ = wait(en_ejecucion, return_when=FIRST_COMPLETED)
+            for futuro in terminadas:
+                nombre = en_ejecucion.pop(futuro)
+                resultados[nombre] = futuro.result()
+                icono = "✅" if resultados[nombre]["estado"] == "ok" else "❌"
+                print(f"{icono} Etapa {nombre} terminada en {resultados[nombre]['segundos']:.2f}s")
+
+    return resultados
+
+
+def imprimir_resumen(resultados: dict, segundos_totales: float):
+    """Tabla con la duración de cada etapa"""
+    iconos = {"ok": "✅", "error": "❌", "omitida": "⏭️ "}
+    print("=" * 60)
+    print("⏱️  RESUMEN DE ETAPAS")
+    print("=" * 60)
+    for nombre, res in sorted(resultados.items(), key=lambda x: -x[1]["segundos"]):
+        detalle = f"  ({res['error']})" if res["error"] else ""
+        print(f"{iconos[res['estado']]} {nombre:<20} {res['segundos']:>8.2f}s{detalle}")
+    print("-" * 60)
+    conexiones = estadisticas_conexion()
+    print(f"🔌 Conexiones a la base: {conexiones['adquisiciones']} adquisiciones, "
+          f"{conexiones['segundos_totales']:.2f}s conectando (máx {conexiones['segundos_max']:.2f}s)")
+    print(f"🕒 Tiempo total (reloj): {segundos_totales:.2f}s")
+
+
+def ejecutar_todo() -> bool:
+    """
+    Corre el DAG completo una vez. Devuelve True si todas las etapas terminaron bien.
+
+    Al final registra la corrida en etl_runs: si alguna etapa escribió datos
+    el dashboard ve una versión nueva y recarga (una sola vez).
+    """
+    iniciado_en = datetime.now()
+    inicio = time.perf_counter()
+    reiniciar_filas_modificadas()
+    resultados = ejecutar_dag()
+    ok = all(res["estado"] == "ok" for res in resultados.values())
+    imprimir_resumen(resultados, time.perf_counter() - inicio)
+    registrar_corrida(iniciado_en, "ok" if ok else "con_errores")
+    return ok
+
+
+# ==================== EJECUCIÓN ====================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Orquestador de todos los ETL")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Queda corriendo y ejecuta el DAG todos los días a --hora")
+    parser.add_argument("--hora", default=HORA_DIARIA,
+                        help="Hora diaria HH:MM para el modo daemon (hora local)")
+    args = parser.parse_args()
+
+    if args.daemon:
+        print(f"🕰️  Modo daemon: ejecución diaria a las {args.hora}")
+        schedule.every().day.at(args.hora).do(ejecutar_todo)
+        while True:
+            schedule.run_pending()
+            time.sleep(30)
+    else:
+        ok = ejecutar_todo()
+        cerrar_pool()
+        raise SystemExit(0 if ok else 1)
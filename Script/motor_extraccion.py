@@ -0,0 +1,115 @@
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import threading
+import time
+import os
+
+from cliente_http import obtener_cliente
+
+# --- CONFIGURACIÓN DEL MOTOR ---
+
+# Cantidad máxima de peticiones HTTP en vuelo al mismo tiempo (todas las APIs)
+MAX_EN_VUELO = int(os.getenv("ETL_MAX_EN_VUELO", "6"))
+
+# Cantidad máxima de peticiones simultáneas contra un mismo host
+MAX_POR_HOST = int(os.getenv("ETL_MAX_POR_HOST", "3"))
+
+# Separación mínima (segundos) entre dos peticiones que arrancan contra el mismo host
+PAUSA_POR_HOST = float(os.getenv("ETL_PAUSA_POR_HOST", "0.2"))
+
+
+class MotorExtraccion:
+    """
+    Descarga varios endpoints en paralelo respetando límites por host.
+
+    Los límites valen por instancia: los ETL usan la del proceso
+    (ver obtener_motor) para que se sumen entre etapas y bloques paralelos.
+    """
+
+    def __init__(self, max_en_vuelo=MAX_EN_VUELO, max_por_host=MAX_POR_HOST,
+                 pausa_por_host=PAUSA_POR_HOST, timeout=10, cliente=None):
+        self.max_en_vuelo = max(1, max_en_vuelo)
+        self.max_por_host = max(1, max_por_host)
+        self.pausa_por_host = pausa_por_host
+        self.timeout = timeout
+
+        # Cliente HTTP compartido (keep-alive, gzip y cache de validadores)
+        self.cliente = cliente or obtener_cliente()
+
+        self._lock = threading.Lock()
+        # Peticiones en vuelo entre todas las llamadas a descargar/obtener (cada una tiene su pool de hilos)
+        self._en_vuelo = threading.BoundedSemaphore(self.max_en_vuelo)
+        self._semaforos_host = {}
+        self._proximo_turno_host = {}
+
+    def _semaforo(self, host):
+        with self._lock:
+            if host not in self._semaforos_host:
+                self._semaforos_host[host] = threading.BoundedSemaphore(self.max_por_host)
+            return self._semaforos_host[host]
+
+    def _esperar_turno(self, host):
+        """Reserva el próximo turno libre del host y duerme hasta que llegue"""
+        with self._lock:
+            ahora = time.monotonic()
+            turno = max(ahora, self._proximo_turno_host.get(host, 0.0))
+            self._proximo_turno_host[host] = turno + self.pausa_por_host
+        espera = turno - ahora
+        if espera > 0:
+            time.sleep(espera)
+
+    def obtener(self, url, condicional=False) -> requests.Response:
+        """
+        Hace un GET respetando la cortesía por host.
+
+        No llama a raise_for_status(): cada ETL decide qué hacer con
+        los códigos de error (ej: 404 = feriado en FCI, 304 = sin cambios).
+        """
+        host = urlparse(url).netloc
+        with self._en_vuelo, self._semaforo(host):
+            self._esperar_turno(host)
+            return self.cliente.get(url, condicional=condicional, timeout=self.timeout)
+
+    def descargar(self, urls: dict, condicionales=()) -> dict:
+        """
+        Descarga en paralelo un diccionario {clave: url}.
+
+        Args:
+            urls (dict): {clave: url}
+            condicionales (iterable): Claves que se piden con If-None-Match /
+                If-Modified-Since (pueden volver con 304).
+
+        Returns:
+            dict: {clave: requests.Response}. Si una petición falla por
+            conexión/timeout, su clave queda con valor None.
+        """
+        if not urls:
+            return {}
+
+        condicionales = set(condicionales)
+
+        def _tarea(item):
+            clave, url = item
+            try:
+                return clave, self.obtener(url, condicional=clave in condicionales)
+            except requests.exceptions.RequestException as e:
+                print(f"❌ Error API ({clave}): {e}")
+                return clave, None
+
+        hilos = min(self.max_en_vuelo, len(urls))
+        with ThreadPoolExecutor(max_workers=hilos) as executor:
+            return dict(executor.map(_tarea, urls.items()))
+
+
+_motor = None
+_lock_motor = threading.Lock()
+
+
+def obtener_motor() -> MotorExtraccion:
+    """Motor único del proceso: los límites por host valen para todas las etapas del orquestador"""
+    global _motor
+    with _lock_motor:
+        if _motor is None:
+            _motor = MotorExtraccion()
+        return _motor
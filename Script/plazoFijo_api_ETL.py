@@ -1,17 +1,16 @@
 import requests
 import psycopg2
-from psycopg2 import sql
 from datetime import datetime
 from dotenv import load_dotenv
-import os
+
+from carga_masiva import cargar_masivo, registrar_filas_modificadas
+from conexion_db import DATABASE_URL, transaccion
+from motor_extraccion import obtener_motor
+from almacen_crudo import guardar_crudo
 
 # Cargar variables de entorno
 load_dotenv()
 
-# --- CONFIGURACIÓN BASE DE DATOS ---
-
-DATABASE_URL = os.getenv("DATABASE_URL_NEON")
-
 if not DATABASE_URL:
     raise ValueError("❌ Error: No se encontró la variable DATABASE_URL_NEON en el archivo .env")
 
@@ -20,11 +19,7 @@ URL_API_PF = "https://api.argentinadatos.com/v1/finanzas/tasas/plazoFijo"
 
 def inicializar_tabla_pf():
     """Crea la tabla para historial de Plazos Fijos si no existe."""
-    conn = None
     try:
-        conn = psycopg2.connect(DATABASE_URL)
-        cur = conn.cursor()
-        
         # Estructura: Banco, Fecha, y Tasa Nominal Anual (TNA)
         query = f"""
         CREATE TABLE IF NOT EXISTS {NOMBRE_TABLA_PF} (
@@ -36,74 +31,81 @@ def inicializar_tabla_pf():
             UNIQUE(entidad, fecha)
         );
         """
-        cur.execute(query)
-        conn.commit()
+        with transaccion() as cur:
+            cur.execute(query)
         
     except psycopg2.Error as e:
         print(f"❌ Error al crear tabla: {e}")
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
+        raise
+
+def transformar_tasas(datos: list, fecha: str) -> list:
+    """
+    Filas (entidad, fecha, tna_clientes, tna_no_clientes) de la respuesta de la API.
+    """
+    filas = []
+    for banco in datos:
+        entidad = banco.get("entidad", "Desconocido")
+        tna_clientes = banco.get("tnaClientes")
+        tna_no_clientes = banco.get("tnaNoClientes")
+        
+        # Limpieza básica de datos (si viene null)
+        if tna_clientes is None: tna_clientes = 0
+        if tna_no_clientes is None: tna_no_clientes = 0
+        
+        filas.append((entidad, fecha, tna_clientes, tna_no_clientes))
+    return filas
 
 def guardar_tasas_plazo_fijo():
     
-    conn = None
     try:
-        response = requests.get(URL_API_PF, timeout=10)
-        response.raise_for_status()
-        datos = response.json()
-        
         # Fecha de registro = Hoy (ya que esta API da el valor 'actual')
         fecha_hoy = datetime.now().strftime("%Y-%m-%d")
+
+        # Solo se pide condicional si hoy ya se guardó una foto de las tasas:
+        # un 304 de un día anterior no alcanza, hay que registrar la fecha de hoy
+        with transaccion() as cur:
+            cur.execute(f"SELECT EXISTS (SELECT 1 FROM {NOMBRE_TABLA_PF} WHERE fecha = %s)", (fecha_hoy,))
+            cargado_hoy = cur.fetchone()[0]
+
+        motor = obtener_motor()
+        cliente = motor.cliente
+        response = motor.obtener(URL_API_PF, condicional=cargado_hoy)
+        if cliente.sin_cambios(response):
+            print("⏭️  Tasas de plazo fijo sin cambios desde la última carga")
+            return
+        response.raise_for_status()
+        datos = response.json()
         
-        # 2. Conectar a DB
-        conn = psycopg2.connect(DATABASE_URL)
-        cur = conn.cursor()
-        
-        nuevos = 0
-        actualizados = 0
+        guardar_crudo("plazo_fijo", fecha_hoy, "plazoFijo", response.content)
         
-        # 3. Procesar cada banco
-        for banco in datos:
-            entidad = banco.get("entidad", "Desconocido")
-            tna_clientes = banco.get("tnaClientes")
-            tna_no_clientes = banco.get("tnaNoClientes")
-            
-            # Limpieza básica de datos (si viene null)
-            if tna_clientes is None: tna_clientes = 0
-            if tna_no_clientes is None: tna_no_clientes = 0
-            
-            # SQL Upsert:
-            # - Intenta Insertar
-            # - Si ya existe (mismo banco, misma fecha) -> Actualiza los valores (por si la API corrigió el dato durante el día)
-            query = sql.SQL("""
-                INSERT INTO {} (entidad, fecha, tna_clientes, tna_no_clientes)
-                VALUES (%s, %s, %s, %s)
-                ON CONFLICT (entidad, fecha) 
-                DO UPDATE SET 
-                    tna_clientes = EXCLUDED.tna_clientes,
-                    tna_no_clientes = EXCLUDED.tna_no_clientes;
-            """).format(sql.Identifier(NOMBRE_TABLA_PF))
-            
-            cur.execute(query, (entidad, fecha_hoy, tna_clientes, tna_no_clientes))
-            
-            # Verificar qué pasó (insert o update)
-            # En Postgres es difícil saber exacto con rowcount en upsert, 
-            # pero asumiremos que procesó correctamente.
-            nuevos += 1
-
-        conn.commit()
-        print(f"🚀 Datos guardados en PostgreSQL.")
+        # 2. Procesar cada banco
+        filas = transformar_tasas(datos, fecha_hoy)
+
+        # 3. Upsert masivo:
+        # - Intenta Insertar
+        # - Si ya existe (mismo banco, misma fecha) -> Actualiza los valores (por si la API corrigió el dato durante el día)
+        # El merge devuelve cuántas filas fueron realmente nuevas y cuántas cambiaron
+        with transaccion() as cur:
+            nuevos, actualizados = cargar_masivo(
+                cur,
+                NOMBRE_TABLA_PF,
+                ["entidad", "fecha", "tna_clientes", "tna_no_clientes"],
+                filas,
+                claves=["entidad", "fecha"],
+                actualizar=["tna_clientes", "tna_no_clientes"],
+            )
+
+        registrar_filas_modificadas(NOMBRE_TABLA_PF, nuevos + actualizados)
+        cliente.confirmar(response)
+
+        print(f"🚀 Datos guardados en PostgreSQL: {nuevos} nuevos, {actualizados} actualizados.")
 
     except requests.exceptions.RequestException as e:
         print(f"❌ Error de conexión con la API: {e}")
+        raise
     except psycopg2.Error as e:
         print(f"❌ Error de Base de Datos: {e}")
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
+        raise
 
 if __name__ == "__main__":
     inicializar_tabla_pf()
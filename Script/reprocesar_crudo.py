@@ -0,0 +1,243 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, datetime
+from itertools import chain
+from dotenv import load_dotenv
+import argparse
+import time
+import os
+
+import DOLAR_hist_ETL
+import plazoFijo_api_ETL
+import FCI_api_ETL
+import INFLACION_api_ETL
+import vista_consolidada
+from almacen_crudo import listar_crudos, leer_crudo
+from carga_masiva import cargar_masivo, registrar_filas_modificadas, reiniciar_filas_modificadas
+from conexion_db import transaccion, cerrar_pool
+from version_datos import registrar_corrida
+
+load_dotenv()
+
+# --- CONFIGURACIÓN DEL REPROCESO ---
+
+# Procesos que decodifican y transforman archivos en paralelo
+PROCESOS = int(os.getenv("ETL_PROCESOS_REPROCESO", str(os.cpu_count() or 2)))
+
+
+# ==================== TRANSFORMACIONES ====================
+# Mismas funciones que usan los ETL: corregir un parseo ahí corrige el reproceso
+
+def _filas_fci(fecha_str, clave, datos):
+    return FCI_api_ETL.filtrar_billeteras_objetivo(datos, fecha_str)
+
+
+def _filas_dolar_hist(fecha_str, clave, datos):
+    return DOLAR_hist_ETL.transformar_historial(clave, datos)
+
+
+def _filas_inflacion(fecha_str, clave, datos):
+    # La ventana de 12 meses se cuenta desde el día de la descarga
+    inflacion = INFLACION_api_ETL.transformar_inflacion(datos, datetime.fromisoformat(fecha_str))
+    return [(dato['fecha'], dato['valor']) for dato in inflacion]
+
+
+def _filas_plazo_fijo(fecha_str, clave, datos):
+    return plazoFijo_api_ETL.transformar_tasas(datos, fecha_str)
+
+
+# fuente -> cómo se reconstruye su tabla
+# 'solo_ultima': la API devuelve el historial completo en cada descarga,
+# alcanza con el último archivo de cada clave
+FUENTES = {
+    "fci": {
+        "tabla": FCI_api_ETL.NOMBRE_TABLA,
+        "columnas": ["billetera", "fondo", "fecha", "vcp", "patrimonio", "horizonte"],
+        "claves": ["fondo", "fecha"],
+        "actualizar": ["billetera", "vcp", "patrimonio", "horizonte"],
+        "transformar": _filas_fci,
+        "solo_ultima": False,
+    },
+    "dolar_hist": {
+        "tabla": "cotizaciones_dolar_hist",
+        "columnas": ["fecha", "tipo", "compra", "venta", "promedio"],
+        "claves": ["fecha", "tipo"],
+        "actualizar": ["compra", "venta", "promedio"],
+        "transformar": _filas_dolar_hist,
+        "solo_ultima": True,
+    },
+    "inflacion": {
+        "tabla": "inflacion",
+        "columnas": ["fecha", "valor"],
+        "claves": ["fecha"],
+        "actualizar": ["valor"],
+        "columna_actualizado": "updated_at",
+        "transformar": _filas_inflacion,
+        "solo_ultima": False,
+    },
+    "plazo_fijo": {
+        "tabla": plazoFijo_api_ETL.NOMBRE_TABLA_PF,
+        "columnas": ["entidad", "fecha", "tna_clientes", "tna_no_clientes"],
+        "claves": ["entidad", "fecha"],
+        "actualizar": ["tna_clientes", "tna_no_clientes"],
+        "transformar": _filas_plazo_fijo,
+        "solo_ultima": False,
+    },
+}
+
+
+def _transformar_archivo(fuente, fecha_str, clave, ruta) -> list:
+    """Corre en un proceso aparte: lee, descomprime y transforma un archivo"""
+    return FUENTES[fuente]["transformar"](fecha_str, clave, leer_crudo(ruta))
+
+
+# ==================== REPROCESO ====================
+
+def crear_tablas():
+    """Las tablas destino tienen que existir aunque la base esté vacía"""
+    FCI_api_ETL.crear_tabla_postgres()
+    DOLAR_hist_ETL.crear_tabla_historica()
+    plazoFijo_api_ETL.inicializar_tabla_pf()
+    INFLACION_api_ETL.ExtractorInflacion().crear_tabla_db()
+
+
+def archivos_a_procesar(fuente, desde=None, hasta=None) -> list:
+    """
+    Returns:
+        list: Tuplas (fecha_str, clave, ruta) en orden cronológico
+    """
+    archivos = listar_crudos(fuente, desde, hasta)
+    if FUENTES[fuente]["solo_ultima"]:
+        ultimos = {clave: (fecha_str, clave, ruta) for fecha_str, clave, ruta in archivos}
+        archivos = sorted(ultimos.values())
+    return archivos
+
+
+def reprocesar_fuente(fuente, procesos_pool, desde=None, hasta=None, reemplazar=False) -> dict:
+    """
+    Reconstruye la tabla de una fuente desde el almacén crudo.
+
+    Las filas se transforman en el pool de procesos y se cargan a medida que
+    llegan (COPY por lotes). Si una fecha aparece en varios archivos gana
+    el más reciente.
+
+    Returns:
+        dict: {'archivos': int, 'insertados': int, 'actualizados': int, 'segundos': float}
+    """
+    config = FUENTES[fuente]
+    inicio = time.perf_counter()
+    archivos = archivos_a_procesar(fuente, desde, hasta)
+
+    if not archivos:
+        print(f"⚠️ {fuente}: no hay archivos crudos para reprocesar")
+        return {"archivos": 0, "insertados": 0, "actualizados": 0, "segundos": 0.0}
+
+    # map conserva el orden de los archivos: la última versión de cada fila es la más nueva
+    resultados = procesos_pool.map(
+        _transformar_archivo,
+        [fuente] * len(archivos),
+        *zip(*archivos),
+        chunksize=max(1, len(archivos) // 64),
+    )
+
+    with transaccion() as cur:
+        if reemplazar:
+            cur.execute(f"TRUNCATE TABLE {config['tabla']} RESTART IDENTITY")
+        insertados, actualizados = cargar_masivo(
+            cur,
+            config["tabla"],
+            config["columnas"],
+            chain.from_iterable(resultados),
+            claves=config["claves"],
+            actualizar=config["actualizar"],
+            columna_actualizado=config.get("columna_actualizado"),
+        )
+    registrar_filas_modificadas(config["tabla"], insertados + actualizados)
+
+    segundos = time.perf_counter() - inicio
+    print(f"✅ {fuente}: {len(archivos)} archivos -> {insertados} nuevos, {actualizados} actualizados ({segundos:.2f}s)")
+    return {"archivos": len(archivos), "insertados": insertados, "actualizados": actualizados, "segundos": segundos}
+
+
+def reprocesar(fuentes=tuple(FUENTES), desde=None, hasta=None, reemplazar=False, procesos=PROCESOS) -> dict:
+    """
+    Reconstruye las tablas pedidas sin tocar la red.
+
+    Args:
+        fuentes (iterable): Claves de FUENTES a reconstruir.
+        desde (date): Primera partición del almacén a leer (opcional).
+        hasta (date): Última partición del almacén a leer (opcional).
+        reemplazar (bool): Vacía cada tabla antes de cargarla (reconstrucción completa).
+        procesos (int): Procesos para decodificar y transformar.
+
+    Returns:
+        dict: {fuente: resumen de reprocesar_fuente}
+    """
+    print("=" * 60)
+    print(f"♻️  REPROCESO DESDE EL ALMACÉN CRUDO ({', '.join(fuentes)})")
+    print("=" * 60)
+
+    iniciado_en = datetime.now()
+    reiniciar_filas_modificadas()
+    crear_tablas()
+    # Los procesos hijos no deben heredar conexiones abiertas (el pool se vuelve a abrir solo)
+    cerrar_pool()
+
+    resumen = {}
+    # Un proceso por núcleo para el parseo; cada fuente carga en su propio hilo/conexión
+    with ProcessPoolExecutor(max_workers=max(1, procesos)) as procesos_pool, \
+            ThreadPoolExecutor(max_workers=len(fuentes)) as hilos:
+        futuros = {
+            fuente: hilos.submit(reprocesar_fuente, fuente, procesos_pool, desde, hasta, reemplazar)
+            for fuente in fuentes
+        }
+        for fuente, futuro in futuros.items():
+            try:
+                resumen[fuente] = futuro.result()
+            except Exception as e:
+                # Cualquier error (ej: un crudo mal formado) corta solo esta fuente:
+                # lo que las demás ya confirmaron se registra igual en la corrida
+                print(f"❌ {fuente}: error al reprocesar: {type(e).__name__}: {e}")
+
+    ok = len(resumen) == len(fuentes)
+    try:
+        # Pudieron cambiar VCP ya cargados: se recalcula todo el TNA
+        if resumen.get("fci", {}).get("archivos"):
+            FCI_api_ETL.actualizar_tna_existentes(completo=True)
+
+        if resumen.get("inflacion", {}).get("archivos"):
+            with transaccion() as cur:
+                dias = INFLACION_api_ETL.actualizar_indice_diario(cur)
+            registrar_filas_modificadas(INFLACION_api_ETL.NOMBRE_TABLA_INDICE, dias)
+
+        if any(res["archivos"] for res in resumen.values()):
+            vista_consolidada.refrescar_vista_consolidada()
+    except Exception as e:
+        # Lo ya cargado queda registrado igual (el dashboard tiene que enterarse)
+        print(f"❌ Error al recalcular TNA, índice o vistas: {e}")
+        ok = False
+
+    registrar_corrida(iniciado_en, "ok" if ok else "con_errores")
+    return resumen
+
+
+# ==================== EJECUCIÓN ====================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconstruye las tablas desde el almacén de respuestas crudas (sin red)")
+    parser.add_argument("--fuentes", nargs="+", choices=list(FUENTES), default=list(FUENTES),
+                        help="Fuentes a reconstruir (por defecto todas)")
+    parser.add_argument("--desde", type=date.fromisoformat,
+                        help="Primera partición a leer (YYYY-MM-DD)")
+    parser.add_argument("--hasta", type=date.fromisoformat,
+                        help="Última partición a leer (YYYY-MM-DD)")
+    parser.add_argument("--reemplazar", action="store_true",
+                        help="Vacía las tablas antes de cargarlas (lo que no esté en el almacén crudo se pierde)")
+    parser.add_argument("--procesos", type=int, default=PROCESOS,
+                        help="Procesos para descomprimir y transformar en paralelo")
+    args = parser.parse_args()
+
+    if args.reemplazar and (args.desde or args.hasta):
+        parser.error("--reemplazar reconstruye la tabla completa: no se combina con --desde/--hasta")
+
+    reprocesar(args.fuentes, args.desde, args.hasta, args.reemplazar, args.procesos)
+    cerrar_pool()
@@ -0,0 +1,66 @@
+from datetime import datetime
+import psycopg2
+from dotenv import load_dotenv
+
+from carga_masiva import filas_modificadas
+from conexion_db import transaccion
+
+load_dotenv()
+
+# --- CONFIGURACIÓN DEL REGISTRO DE CORRIDAS ---
+
+NOMBRE_TABLA_CORRIDAS = "etl_runs"
+
+# Una fila por corrida del orquestador (o del reproceso).
+# La versión de los datos que usa el dashboard es el id de la última corrida
+# que escribió en alguna tabla: si nada cambió no hay versión nueva y el
+# dashboard sigue usando lo que ya tiene en cache.
+
+
+def crear_tabla_corridas(cur):
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {NOMBRE_TABLA_CORRIDAS} (
+            id BIGSERIAL PRIMARY KEY,
+            iniciado_en TIMESTAMP NOT NULL,
+            terminado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            estado VARCHAR(20) NOT NULL,
+            filas_modificadas INTEGER NOT NULL,
+            tablas TEXT[] NOT NULL DEFAULT '{{}}'
+        )
+    """)
+
+
+def registrar_corrida(iniciado_en: datetime, estado: str) -> dict:
+    """
+    Guarda la corrida con las filas que escribió cada tabla (ver carga_masiva).
+
+    Args:
+        iniciado_en (datetime): Inicio de la corrida.
+        estado (str): 'ok' o 'con_errores'.
+
+    Returns:
+        dict: {'id': int, 'filas': int, 'tablas': list} (id None si no se pudo guardar)
+    """
+    modificadas = filas_modificadas()
+    filas = sum(modificadas.values())
+    tablas = sorted(modificadas)
+
+    try:
+        with transaccion() as cur:
+            crear_tabla_corridas(cur)
+            cur.execute(f"""
+                INSERT INTO {NOMBRE_TABLA_CORRIDAS} (iniciado_en, estado, filas_modificadas, tablas)
+                VALUES (%s, %s, %s, %s)
+                RETURNING id
+            """, (iniciado_en, estado, filas, tablas))
+            id_corrida = cur.fetchone()[0]
+    except psycopg2.Error as e:
+        print(f"❌ Error al registrar la corrida: {e}")
+        id_corrida = None
+
+    if id_corrida is not None and filas:
+        print(f"🆕 Nueva versión de datos #{id_corrida}: {filas} filas en {', '.join(tablas)}")
+    elif id_corrida is not None:
+        print("💤 Sin cambios en los datos: el dashboard mantiene su cache")
+
+    return {"id": id_corrida, "filas": filas, "tablas": tablas}
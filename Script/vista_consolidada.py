@@ -0,0 +1,247 @@
+import psycopg2
+from dotenv import load_dotenv
+
+from conexion_db import transaccion
+
+load_dotenv()
+
+# --- CONFIGURACIÓN DE LA VISTA ---
+
+NOMBRE_VISTA = "serie_consolidada"
+
+# Cambiar cuando cambie la definición: la vista se vuelve a crear en la próxima corrida
+VERSION_VISTA = "3"
+
+# Inflación mensual (%) que se asume antes del primer mes publicado o sin datos de inflación
+TASA_INFLACION_DEFECTO = 3.0
+
+# Serie diaria consolidada (una fila por fecha y serie) para el dashboard:
+#   - FCI (una serie por billetera): VCP y TNA convertida a rendimiento acumulado
+#   - Dólar (una serie por tipo): venta promedio del día
+#   - Inflación: índice diario acumulado (tabla inflacion_diaria)
+# Días sin dato (fines de semana, feriados) se rellenan con el último valor conocido.
+# Los acumulados arrancan en 1 al inicio del historial: el dashboard re-normaliza
+# a base 100 en el primer día de la ventana que muestra.
+QUERY_VISTA = f"""
+CREATE MATERIALIZED VIEW {NOMBRE_VISTA} AS
+WITH fci AS (
+    SELECT fecha, billetera AS serie,
+           AVG(vcp)::float8 AS vcp,
+           AVG(COALESCE(tna, 0))::float8 AS tna
+    FROM rendimientos_fci
+    WHERE billetera IS NOT NULL
+    GROUP BY fecha, billetera
+),
+fci_acumulado AS (
+    -- Interés compuesto diario: producto de (1 + TNA/100/365) como suma de logaritmos
+    SELECT fecha, serie, vcp,
+           EXP(SUM(LN(1 + tna / 100 / 365)) OVER (PARTITION BY serie ORDER BY fecha)) AS tna_acumulado
+    FROM fci
+),
+dolar AS (
+    SELECT fecha, 'Dólar ' || tipo AS serie,
+           AVG(venta)::float8 AS vcp,
+           AVG(venta)::float8 AS tna_acumulado
+    FROM cotizaciones_dolar_hist
+    GROUP BY fecha, tipo
+),
+observado AS (
+    SELECT fecha, serie, vcp, tna_acumulado FROM fci_acumulado
+    UNION ALL
+    SELECT fecha, serie, vcp, tna_acumulado FROM dolar
+),
+calendario AS (
+    SELECT generate_series(MIN(fecha), MAX(fecha), INTERVAL '1 day')::date AS fecha
+    FROM observado
+),
+series AS (
+    SELECT serie, MIN(fecha) AS desde
+    FROM observado
+    GROUP BY serie
+),
+grilla AS (
+    -- grupo = cantidad de datos reales vistos hasta el día: los huecos comparten grupo con el último dato
+    SELECT cal.fecha, s.serie, o.vcp, o.tna_acumulado,
+           COUNT(o.vcp) OVER (PARTITION BY s.serie ORDER BY cal.fecha) AS grupo
+    FROM series s
+    JOIN calendario cal ON cal.fecha >= s.desde
+    LEFT JOIN observado o ON o.serie = s.serie AND o.fecha = cal.fecha
+),
+series_rellenas AS (
+    SELECT fecha, serie,
+           MAX(vcp) OVER (PARTITION BY serie, grupo) AS vcp,
+           MAX(tna_acumulado) OVER (PARTITION BY serie, grupo) AS tna_acumulado
+    FROM grilla
+),
+inflacion_primera AS (
+    SELECT fecha, indice
+    FROM inflacion_diaria
+    ORDER BY fecha
+    LIMIT 1
+),
+inflacion_ultima AS (
+    SELECT fecha, valor_mensual, indice
+    FROM inflacion_diaria
+    ORDER BY fecha DESC
+    LIMIT 1
+),
+inflacion_indice AS (
+    -- Índice diario que mantiene el ETL de inflación; los días posteriores al último
+    -- mes publicado se proyectan con esa misma tasa: (1 + TasaMensual)^(días/30).
+    -- Antes del primer mes publicado (o con la tabla vacía) se asume la tasa por defecto.
+    SELECT cal.fecha,
+           CASE WHEN cal.fecha < p.fecha
+                    THEN p.indice / POWER(1 + {TASA_INFLACION_DEFECTO} / 100, (p.fecha - cal.fecha) / 30.0)
+                WHEN cal.fecha <= u.fecha THEN d.indice
+                ELSE COALESCE(u.indice, 1.0)
+                     * POWER(1 + COALESCE(u.valor_mensual::float8, {TASA_INFLACION_DEFECTO}) / 100,
+                             (cal.fecha - COALESCE(u.fecha, MIN(cal.fecha) OVER ())) / 30.0)
+           END AS indice
+    FROM calendario cal
+    LEFT JOIN inflacion_primera p ON TRUE
+    LEFT JOIN inflacion_ultima u ON TRUE
+    LEFT JOIN inflacion_diaria d ON d.fecha = cal.fecha
+)
+SELECT fecha, serie, vcp, tna_acumulado FROM series_rellenas
+UNION ALL
+SELECT fecha, 'Inflación', indice, indice FROM inflacion_indice WHERE indice IS NOT NULL
+WITH DATA
+"""
+
+
+
+NOMBRE_VISTA_ESTADISTICAS = "estadisticas_fondos"
+
+VERSION_VISTA_ESTADISTICAS = "1"
+
+# Estadísticas por fondo (una fila por billetera) calculadas sobre la serie consolidada:
+#   - TNA de los últimos 7, 30 y 90 días: rendimiento diario geométrico
+#     (VCP final / VCP inicial) ^ (1 / cantidad de días) - 1, anualizado * 365
+#   - Volatilidad: desvío de los log-rendimientos diarios de 90 días, anualizado
+#   - Último VCP
+# Mismo cálculo que analitica.estadisticas_fondos en el dashboard.
+QUERY_VISTA_ESTADISTICAS = f"""
+CREATE MATERIALIZED VIEW {NOMBRE_VISTA_ESTADISTICAS} AS
+WITH ultima AS (
+    SELECT MAX(fecha) AS fecha FROM {NOMBRE_VISTA}
+),
+fci AS (
+    SELECT s.fecha, s.serie, s.vcp
+    FROM {NOMBRE_VISTA} s, ultima u
+    WHERE s.serie <> 'Inflación' AND s.serie NOT LIKE 'Dólar %'
+      AND s.fecha >= u.fecha - 90
+      AND s.vcp IS NOT NULL
+),
+ventanas AS (
+    SELECT f.serie, v.dias,
+           (ARRAY_AGG(f.vcp ORDER BY f.fecha))[1] AS primero,
+           (ARRAY_AGG(f.vcp ORDER BY f.fecha DESC))[1] AS ultimo,
+           COUNT(*) AS cantidad
+    FROM fci f
+    CROSS JOIN (VALUES (7), (30), (90)) AS v(dias)
+    CROSS JOIN ultima u
+    WHERE f.fecha >= u.fecha - v.dias
+    GROUP BY f.serie, v.dias
+),
+tnas AS (
+    SELECT serie, dias, ultimo,
+           CASE WHEN cantidad > 1 AND ultimo / NULLIF(primero, 0) > 0
+                THEN (POWER(ultimo / primero, 1.0 / cantidad) - 1) * 365 * 100
+           END AS tna
+    FROM ventanas
+),
+rendimientos AS (
+    SELECT serie,
+           LN(vcp / NULLIF(LAG(vcp) OVER (PARTITION BY serie ORDER BY fecha), 0)) AS log_rendimiento
+    FROM fci
+    WHERE vcp > 0
+)
+SELECT t.serie AS fondo,
+       MAX(t.tna) FILTER (WHERE t.dias = 7) AS tna_7d,
+       MAX(t.tna) FILTER (WHERE t.dias = 30) AS tna_30d,
+       MAX(t.tna) FILTER (WHERE t.dias = 90) AS tna_90d,
+       (SELECT STDDEV_SAMP(r.log_rendimiento) * SQRT(365) * 100
+        FROM rendimientos r WHERE r.serie = t.serie) AS volatilidad,
+       MAX(t.ultimo) FILTER (WHERE t.dias = 90) AS ultimo_vcp
+FROM tnas t
+GROUP BY t.serie
+WITH DATA
+"""
+
+
+def crear_vista(cur, nombre, query, version, columnas_indice) -> bool:
+    """
+    Crea una vista materializada (o la recrea si cambió su versión).
+
+    Args:
+        nombre (str): Nombre de la vista.
+        query (str): CREATE MATERIALIZED VIEW ...
+        version (str): Versión de la definición (se guarda como comentario de la vista).
+        columnas_indice (str): Columnas del índice único.
+
+    Returns:
+        bool: True si la vista se creó (ya queda con datos, no hace falta refrescarla)
+    """
+    cur.execute("""
+        SELECT obj_description(c.oid, 'pg_class')
+        FROM pg_class c
+        WHERE c.relname = %s AND c.relkind = 'm'
+    """, (nombre,))
+    fila = cur.fetchone()
+
+    if fila is not None and fila[0] == f"version {version}":
+        return False
+
+    if fila is not None:
+        print(f"🔁 La vista '{nombre}' cambió de definición, se vuelve a crear")
+        # CASCADE: las vistas que dependen de esta se vuelven a crear en la misma corrida
+        cur.execute(f"DROP MATERIALIZED VIEW {nombre} CASCADE")
+
+    cur.execute(query)
+    # Índice único: lo exige REFRESH ... CONCURRENTLY y sirve para las búsquedas del dashboard
+    cur.execute(f"CREATE UNIQUE INDEX idx_{nombre}_{columnas_indice.replace(', ', '_')} ON {nombre} ({columnas_indice})")
+    cur.execute(f"COMMENT ON MATERIALIZED VIEW {nombre} IS 'version {version}'")
+    return True
+
+
+def crear_vista_consolidada(cur) -> bool:
+    """Crea la vista de la serie consolidada (ver crear_vista)"""
+    return crear_vista(cur, NOMBRE_VISTA, QUERY_VISTA, VERSION_VISTA, "fecha, serie")
+
+
+def crear_vista_estadisticas(cur) -> bool:
+    """Crea la vista de estadísticas por fondo (ver crear_vista). Necesita la serie consolidada."""
+    return crear_vista(cur, NOMBRE_VISTA_ESTADISTICAS, QUERY_VISTA_ESTADISTICAS, VERSION_VISTA_ESTADISTICAS, "fondo")
+
+
+def _refrescar(nombre, crear):
+    with transaccion() as cur:
+        creada = crear(cur)
+    if creada:
+        print(f"✅ Vista '{nombre}' creada")
+        return
+
+    with transaccion() as cur:
+        cur.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {nombre}")
+    print(f"✅ Vista '{nombre}' actualizada")
+
+
+def refrescar_vista_consolidada():
+    """
+    Deja las vistas al día después de cargar FCI, dólar e inflación: primero la
+    serie consolidada y después las estadísticas por fondo, que se calculan sobre ella.
+
+    CONCURRENTLY: el dashboard puede seguir leyendo la versión anterior
+    mientras se recalcula (no toma un lock exclusivo).
+    """
+    try:
+        _refrescar(NOMBRE_VISTA, crear_vista_consolidada)
+        _refrescar(NOMBRE_VISTA_ESTADISTICAS, crear_vista_estadisticas)
+
+    except psycopg2.Error as e:
+        print(f"❌ Error al actualizar la vista consolidada: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    refrescar_vista_consolidada()